@@ -1,3 +1,25 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from bookings.models import Seat
+from bookings.reservations import reserve_seats
+from bookings.tests import QueryPlanTestCase, create_showtime
+from movies.pagination import KeysetPaginator
+from .views import ProfileView, UserBookingsView
 
-# Create your tests here.
+
+class AccountQueryPlanTests(QueryPlanTestCase):
+    def setUp(self):
+        super().setUp()
+        showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret')
+        reserve_seats(self.user, showtime, list(Seat.objects.values_list('id', flat=True)[:2]))
+
+    def test_profile(self):
+        self.assertViewIndexed(ProfileView, user=self.user)
+
+    def test_user_bookings(self):
+        self.assertViewIndexed(UserBookingsView, user=self.user)
+
+    def test_user_bookings_cursor(self):
+        bookings = self.user.bookings.all()
+        cursor = KeysetPaginator(bookings, 10, UserBookingsView.keyset).cursor_for(bookings.get())
+        self.assertViewIndexed(UserBookingsView, f'/?cursor={cursor}', self.user)
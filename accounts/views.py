@@ -6,6 +6,7 @@ from django.contrib.auth import login
 from django.contrib import messages
 from django.urls import reverse_lazy
 from bookings.models import Booking
+from movies.pagination import KeysetPaginationMixin
 from .models import UserProfile
 
 
@@ -33,11 +34,12 @@ class ProfileView(LoginRequiredMixin, TemplateView):
         return context
 
 
-class UserBookingsView(LoginRequiredMixin, ListView):
+class UserBookingsView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Booking
     template_name = 'accounts/user_bookings.html'
     context_object_name = 'bookings'
     paginate_by = 10
+    keyset = ('-booking_time', '-id')
 
     def get_queryset(self):
         return Booking.objects.filter(user=self.request.user).order_by('-booking_time')
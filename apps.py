@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class MoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.movies'
+
+    def ready(self):
+        from . import autocomplete, checks  # noqa: F401
+        from .search import install_search_index
+        post_migrate.connect(install_search_index, sender=self)
+
+        # Keep the autocomplete index of this process in step with the catalogue
+        Movie = self.get_model('Movie')
+        post_save.connect(autocomplete.update_movie, sender=Movie)
+        post_delete.connect(autocomplete.remove_movie, sender=Movie)
@@ -0,0 +1,298 @@
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from django.core.cache import cache
+from django.db import transaction
+
+MAX_SUGGESTIONS = 10
+# Prefixes whose suggestions are remembered between changes
+CACHE_SIZE = 20000
+# Bumped on every catalogue change so each process knows its index is stale
+VERSION_KEY = 'movieautocomplete:version'
+# Rating changes are numbered separately and logged one movie per number,
+# so other processes re-rank just those movies instead of rebuilding
+SCORES_KEY = 'movieautocomplete:scores'
+SCORE_CHANGE_KEY = 'movieautocomplete:scores:%s'
+SCORE_LOG_TTL = 24 * 60 * 60
+# Beyond this many logged changes, re-reading every score is cheaper
+MAX_SCORE_CHANGES = 500
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+class Entry:
+    """One suggestion: a title, director or cast name and the movies it leads to."""
+
+    __slots__ = ['kind', 'text', 'scores', 'movie_id', 'score']
+
+    def __init__(self, kind, text):
+        self.kind = kind
+        self.text = text
+        self.scores = {}
+        self.movie_id = None
+        self.score = None
+
+    def rescore(self):
+        # The entry ranks as its best rated movie
+        if self.scores:
+            self.movie_id, self.score = max(self.scores.items(), key=lambda item: item[1])
+
+    def keys(self):
+        # Every word start, so "knight" finds "The Dark Knight"
+        words = normalize(self.text).split(' ')
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class AutocompleteIndex:
+    """
+    Prefix index over movie titles, directors and cast.
+
+    Keys live in a sorted list searched with bisect. The top suggestions
+    of each prefix asked for are remembered until a change touches a key
+    under that prefix, so repeated keystrokes are dictionary lookups.
+    """
+
+    def __init__(self, version=None, scores_version=None):
+        self.version = version
+        self.scores_version = scores_version
+        self.lock = threading.RLock()
+        self.keys = []
+        self.entries = {}
+        self.movies = {}
+        self.cache = {}
+
+    @staticmethod
+    def _names(title, director, cast):
+        names = [('title', title), ('director', director)]
+        names += [('cast', name) for name in cast or () if isinstance(name, str)]
+        return list(dict.fromkeys((kind, text.strip()) for kind, text in names if text and text.strip()))
+
+    def load(self, movies):
+        """Fill an empty index from ``(movie_id, title, director, cast, score)`` rows."""
+        with self.lock:
+            for movie_id, title, director, cast, score in movies:
+                names = self.movies[movie_id] = self._names(title, director, cast)
+                for kind, text in names:
+                    entry = self.entries.get((kind, text))
+                    if entry is None:
+                        entry = self.entries[(kind, text)] = Entry(kind, text)
+                    entry.scores[movie_id] = score
+            for (kind, text), entry in self.entries.items():
+                entry.rescore()
+                self.keys.extend((key, kind, text) for key in entry.keys())
+            self.keys.sort()
+            self.cache.clear()
+
+    def add_movie(self, movie_id, title, director, cast, score):
+        with self.lock:
+            self.remove_movie(movie_id)
+            names = self.movies[movie_id] = self._names(title, director, cast)
+            for kind, text in names:
+                entry = self.entries.get((kind, text))
+                if entry is None:
+                    entry = self.entries[(kind, text)] = Entry(kind, text)
+                    for key in entry.keys():
+                        insort(self.keys, (key, kind, text))
+                entry.scores[movie_id] = score
+                entry.rescore()
+                self._forget(entry)
+
+    def remove_movie(self, movie_id):
+        with self.lock:
+            for kind, text in self.movies.pop(movie_id, ()):
+                entry = self.entries[(kind, text)]
+                del entry.scores[movie_id]
+                entry.rescore()
+                self._forget(entry)
+                if not entry.scores:
+                    del self.entries[(kind, text)]
+                    for key in entry.keys():
+                        position = bisect_left(self.keys, (key, kind, text))
+                        del self.keys[position]
+
+    def set_score(self, movie_id, score):
+        with self.lock:
+            for kind, text in self.movies.get(movie_id, ()):
+                entry = self.entries[(kind, text)]
+                entry.scores[movie_id] = score
+                entry.rescore()
+                self._forget(entry)
+
+    def _forget(self, entry):
+        for key in entry.keys():
+            for end in range(1, len(key) + 1):
+                self.cache.pop(key[:end], None)
+
+    def suggest(self, prefix, limit=MAX_SUGGESTIONS):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        with self.lock:
+            top = self.cache.get(prefix)
+            if top is None:
+                matches = set()
+                position = bisect_left(self.keys, (prefix,))
+                while position < len(self.keys) and self.keys[position][0].startswith(prefix):
+                    matches.add(self.keys[position][1:])
+                    position += 1
+                top = heapq.nlargest(MAX_SUGGESTIONS, (self.entries[match] for match in matches),
+                                     key=lambda entry: entry.score)
+                if len(self.cache) >= CACHE_SIZE:
+                    self.cache.clear()
+                self.cache[prefix] = top
+
+            return [{
+                'type': entry.kind,
+                'text': entry.text,
+                'movie_id': str(entry.movie_id),
+                'movies': len(entry.scores),
+            } for entry in top[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _current(key):
+    value = cache.get(key)
+    if value is None:
+        # Start from the clock so a flushed cache never reuses an old number
+        value = time.time_ns() // 1000
+        cache.add(key, value, None)
+        value = cache.get(key, value)
+    return value
+
+
+def current_version():
+    return _current(VERSION_KEY)
+
+
+def current_scores_version():
+    return _current(SCORES_KEY)
+
+
+def _scores(movies):
+    return ((movie_id, (rating, reviews)) for movie_id, rating, reviews in movies.values_list(
+        'id', 'average_rating', 'total_reviews'
+    ).iterator())
+
+
+def _catch_up_scores(index, scores_version):
+    """Re-rank the movies whose ratings changed since ``index`` last looked."""
+    from .models import Movie
+
+    numbers = range(index.scores_version + 1, scores_version + 1)
+    logged = {}
+    if len(numbers) <= MAX_SCORE_CHANGES:
+        logged = cache.get_many([SCORE_CHANGE_KEY % number for number in numbers])
+    if len(logged) == len(numbers):
+        movies = Movie.objects.filter(id__in=set(logged.values()))
+    else:
+        # Too far behind, or part of the log expired: re-read every score
+        movies = Movie.objects.filter(is_active=True)
+    for movie_id, score in _scores(movies):
+        index.set_score(movie_id, score)
+    index.scores_version = scores_version
+
+
+def get_index():
+    """
+    Return this process's index, reading every active movie on first use
+    and again whenever another process changed the catalogue. Ratings
+    changed elsewhere are applied to the index in place.
+    """
+    global _index
+    version = current_version()
+    scores_version = current_scores_version()
+    if _index is None or _index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                from .models import Movie
+
+                index = AutocompleteIndex(version, scores_version)
+                movies = Movie.objects.filter(is_active=True).values_list(
+                    'id', 'title', 'director', 'cast', 'average_rating', 'total_reviews'
+                )
+                index.load(
+                    (movie_id, title, director, cast, (rating, reviews))
+                    for movie_id, title, director, cast, rating, reviews in movies.iterator()
+                )
+                _index = index
+    index = _index
+    if index.scores_version < scores_version:
+        with _index_lock:
+            if index.scores_version < scores_version:
+                _catch_up_scores(index, scores_version)
+    return index
+
+
+def _changed(apply):
+    # Once the change commits, this process applies it to its own index
+    # and adopts the new version, unless another change came in between.
+    # Other processes rebuild on their next request
+    def commit():
+        index = _index
+        if index is not None:
+            apply(index)
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, time.time_ns() // 1000, None)
+            return
+        if index is not None and index.version == version - 1:
+            index.version = version
+
+    transaction.on_commit(commit)
+
+
+def update_movie(sender, instance, **kwargs):
+    movie_id, active = instance.id, instance.is_active
+    movie = (instance.title, instance.director, instance.cast,
+             (instance.average_rating, instance.total_reviews))
+
+    def apply(index):
+        if active:
+            index.add_movie(movie_id, *movie)
+        else:
+            index.remove_movie(movie_id)
+
+    _changed(apply)
+
+
+def remove_movie(sender, instance, **kwargs):
+    movie_id = instance.id
+    _changed(lambda index: index.remove_movie(movie_id))
+
+
+def refresh_score(movie_id):
+    """
+    Re-rank a movie whose rating changed through an update() rather than
+    save(). Call it once the update has committed.
+
+    The catalogue version stays put, so no process rebuilds its index:
+    this one re-ranks the movie now and others when they next look.
+    """
+    index = _index
+    if index is not None:
+        from .models import Movie
+
+        score = Movie.objects.filter(id=movie_id).values_list('average_rating', 'total_reviews').first()
+        if score is not None:
+            index.set_score(movie_id, score)
+
+    try:
+        number = cache.incr(SCORES_KEY)
+    except ValueError:
+        # The reseeded counter jumps ahead, so every process re-reads all scores
+        cache.add(SCORES_KEY, time.time_ns() // 1000, None)
+        return
+    cache.set(SCORE_CHANGE_KEY % number, movie_id, SCORE_LOG_TTL)
+    if index is not None and index.scores_version == number - 1:
+        index.scores_version = number
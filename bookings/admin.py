@@ -1,4 +1,5 @@
 from django.contrib import admin
+from .layout import invalidate_layout
 from .models import Seat, Booking, BookingSeat
 
 
@@ -9,6 +10,33 @@ class SeatAdmin(admin.ModelAdmin):
     search_fields = ['theater__name', 'row']
     list_editable = ['seat_type', 'is_active']
     ordering = ['theater', 'row', 'number']
+    actions = ['make_regular', 'make_premium', 'make_vip', 'activate', 'deactivate']
+
+    def _bulk_update(self, request, queryset, **fields):
+        theater_ids = set(queryset.values_list('theater_id', flat=True))
+        updated = queryset.update(**fields)
+        invalidate_layout(*theater_ids)
+        self.message_user(request, f'{updated} seats updated.')
+
+    @admin.action(description='Mark selected seats as Regular')
+    def make_regular(self, request, queryset):
+        self._bulk_update(request, queryset, seat_type='REGULAR')
+
+    @admin.action(description='Mark selected seats as Premium')
+    def make_premium(self, request, queryset):
+        self._bulk_update(request, queryset, seat_type='PREMIUM')
+
+    @admin.action(description='Mark selected seats as VIP')
+    def make_vip(self, request, queryset):
+        self._bulk_update(request, queryset, seat_type='VIP')
+
+    @admin.action(description='Activate selected seats')
+    def activate(self, request, queryset):
+        self._bulk_update(request, queryset, is_active=True)
+
+    @admin.action(description='Deactivate selected seats')
+    def deactivate(self, request, queryset):
+        self._bulk_update(request, queryset, is_active=False)
 
 
 class BookingSeatInline(admin.TabularInline):
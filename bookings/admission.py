@@ -0,0 +1,130 @@
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+EPOCH_KEY = 'waitingroom:%s:epoch'
+COUNT_KEY = 'waitingroom:%s:%s:count'
+REBASE_KEY = 'waitingroom:%s:%s:rebased'
+SESSION_KEY = 'waiting_room'
+# Seconds a showtime's admission schedule outlives its last arrival
+SCHEDULE_TTL = 24 * 60 * 60
+
+DEFAULTS = {
+    # Users admitted per second for each showtime once a queue forms
+    'RATE': 5,
+    # Users admitted at once before queueing starts
+    'BURST': 50,
+    # Seconds an admitted user may keep selecting and booking seats
+    'PASS_TTL': 600,
+    # Concurrent booking writes allowed per worker
+    'MAX_CONCURRENT_WRITES': 4,
+    # Seconds a booking waits for a write slot before giving up
+    'WRITE_TIMEOUT': 2,
+}
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'WAITING_ROOM', {})}
+
+
+class Ticket:
+    def __init__(self, slot, rate, now=None):
+        self.slot = slot
+        self.rate = rate
+        self.now = now or time.time()
+
+    @property
+    def admitted(self):
+        return self.now >= self.slot
+
+    @property
+    def eta(self):
+        return max(0, math.ceil(self.slot - self.now))
+
+    @property
+    def position(self):
+        return max(0, math.ceil((self.slot - self.now) * self.rate))
+
+    def as_dict(self):
+        return {'admitted': self.admitted, 'position': self.position, 'eta_seconds': self.eta}
+
+
+def _take_slot(showtime_id, config, now):
+    """
+    Give the next arrival for ``showtime_id`` its admission time.
+
+    Arrivals are numbered with an atomic ``cache.incr`` on a counter
+    shared by every worker, so no two get the same slot. Arrival ``n`` of
+    an epoch is admitted at ``start + (n - 1 - BURST) / RATE``: the first
+    BURST at once, then RATE per second. Once the schedule has fallen
+    more than BURST behind ``now``, the first arrival to notice starts a
+    new epoch, so a quiet spell never banks more than BURST admissions.
+    """
+    interval = 1 / config['RATE']
+    earliest = now - config['BURST'] * interval
+
+    cache.add(EPOCH_KEY % showtime_id, now, SCHEDULE_TTL)
+    start = cache.get(EPOCH_KEY % showtime_id, now)
+    counter = COUNT_KEY % (showtime_id, start)
+    cache.add(counter, 0, SCHEDULE_TTL)
+    try:
+        arrival = cache.incr(counter)
+    except ValueError:
+        # Evicted between add() and incr(); count from the start again
+        cache.add(counter, 1, SCHEDULE_TTL)
+        arrival = 1
+
+    slot = start + (arrival - 1 - config['BURST']) * interval
+    if slot < earliest and cache.add(REBASE_KEY % (showtime_id, start), True, SCHEDULE_TTL):
+        cache.set(EPOCH_KEY % showtime_id, now, SCHEDULE_TTL)
+    return max(slot, earliest)
+
+
+def get_ticket(request, showtime_id):
+    """
+    Return the request's place in the waiting room for ``showtime_id``.
+
+    Users without a valid pass join the queue and get an admission time
+    stored in their session; returning users keep their place.
+    """
+    config = get_config()
+    now = time.time()
+    tickets = request.session.get(SESSION_KEY, {})
+    slot = tickets.get(str(showtime_id))
+
+    if slot is None or now > slot + config['PASS_TTL']:
+        slot = _take_slot(showtime_id, config, now)
+        tickets = {key: value for key, value in tickets.items() if now <= value + config['PASS_TTL']}
+        tickets[str(showtime_id)] = slot
+        request.session[SESSION_KEY] = tickets
+
+    return Ticket(slot, config['RATE'], now)
+
+
+class WriteGate:
+    """Caps concurrent booking transactions in this worker."""
+
+    def __init__(self):
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = threading.BoundedSemaphore(get_config()['MAX_CONCURRENT_WRITES'])
+        return self._semaphore
+
+    def __enter__(self):
+        if not self.semaphore.acquire(timeout=get_config()['WRITE_TIMEOUT']):
+            raise WriteGateBusy()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.semaphore.release()
+
+
+class WriteGateBusy(Exception):
+    pass
+
+
+write_gate = WriteGate()
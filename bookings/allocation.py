@@ -0,0 +1,129 @@
+from itertools import groupby
+
+# Rows are lettered from the screen backwards; the sweet spot sits a bit past the middle
+IDEAL_ROW_RATIO = 0.6
+# One row away from the ideal row costs as much as this many seats off-centre
+ROW_WEIGHT = 1.5
+# Each seat not of the requested type costs as much as this many seats off-centre
+SEAT_TYPE_WEIGHT = 10
+
+_layouts = {}
+
+
+class RowLayout:
+    """
+    Seat positions of a theater grouped into contiguous runs.
+
+    Each segment is ``(row_penalty, row_center, positions, numbers)`` where
+    ``positions`` index into the seat map and ``numbers`` are consecutive
+    seat numbers; a gap in numbering (an aisle) starts a new segment.
+    """
+
+    __slots__ = ['segments']
+
+    def __init__(self, rows, numbers):
+        row_labels = list(dict.fromkeys(rows))
+        ideal_row = (len(row_labels) - 1) * IDEAL_ROW_RATIO
+        self.segments = []
+
+        position = 0
+        for row_index, (_, seats) in enumerate(groupby(zip(rows, numbers), key=lambda seat: seat[0])):
+            row_numbers = [number for _, number in seats]
+            row_center = (row_numbers[0] + row_numbers[-1]) / 2
+            row_penalty = abs(row_index - ideal_row) * ROW_WEIGHT
+
+            start = 0
+            for i in range(1, len(row_numbers) + 1):
+                if i == len(row_numbers) or row_numbers[i] != row_numbers[i - 1] + 1:
+                    self.segments.append((
+                        row_penalty,
+                        row_center,
+                        range(position + start, position + i),
+                        row_numbers[start:i]
+                    ))
+                    start = i
+            position += len(row_numbers)
+
+        self.segments.sort(key=lambda segment: segment[0])
+
+    @classmethod
+    def for_seat_map(cls, seat_map):
+        key = (seat_map.layout.theater_id, seat_map.layout.version)
+        layout = _layouts.get(key)
+        if layout is None:
+            if len(_layouts) > 256:
+                _layouts.clear()
+            layout = _layouts[key] = cls(seat_map.rows, seat_map.numbers)
+        return layout
+
+
+def best_available(seat_map, count, seat_type=None):
+    """
+    Return the ids of the best ``count`` adjacent free seats, or None.
+
+    Candidates are ranked by distance from the row centre plus a penalty
+    for distance from the ideal row. ``seat_type`` is a preference: each
+    seat of another type adds ``SEAT_TYPE_WEIGHT``, so other seats are
+    offered when no block of that type is free.
+    """
+    if count < 1:
+        return None
+
+    layout = RowLayout.for_seat_map(seat_map)
+    bits = seat_map.bits
+    seat_types = seat_map.seat_types
+    half = (count - 1) / 2
+    best_score, best_start = None, None
+
+    for row_penalty, row_center, positions, numbers in layout.segments:
+        if best_score is not None and row_penalty >= best_score:
+            # Segments are sorted by row penalty, nothing further can win
+            break
+        if len(positions) < count:
+            continue
+
+        run_start = None
+        for offset in range(len(positions) + 1):
+            free = False
+            if offset < len(positions):
+                position = positions[offset]
+                free = not bits[position >> 3] & (1 << (position & 7))
+            if free:
+                if run_start is None:
+                    run_start = offset
+                continue
+            if run_start is not None and offset - run_start >= count:
+                if seat_type is None:
+                    # Slide the window as close to the row centre as the run allows
+                    ideal = round(row_center - half) - numbers[0]
+                    start = min(max(ideal, run_start), offset - count)
+                    score = row_penalty + abs(numbers[start] + half - row_center)
+                else:
+                    score, start = _best_window(
+                        [seat_types[position] != seat_type for position in positions[run_start:offset]],
+                        numbers[run_start:offset], count, row_center
+                    )
+                    score += row_penalty
+                    start += run_start
+                if best_score is None or score < best_score:
+                    best_score, best_start = score, positions[start]
+            run_start = None
+
+    if best_start is None:
+        return None
+    return seat_map.seat_ids[best_start:best_start + count]
+
+
+def _best_window(mismatched, numbers, count, row_center):
+    # Best ``(score, start)`` among the windows of one free run, where
+    # ``mismatched`` flags the seats not of the requested type
+    half = (count - 1) / 2
+    misses = sum(mismatched[:count])
+    best = None
+    for start in range(len(numbers) - count + 1):
+        if start:
+            misses += mismatched[start + count - 1] - mismatched[start - 1]
+        score = abs(numbers[start] + half - row_center) + misses * SEAT_TYPE_WEIGHT
+        if best is None or score < best[0]:
+            best = (score, start)
+    return best
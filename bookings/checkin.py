@@ -0,0 +1,148 @@
+import atexit
+import threading
+import time
+from django.core import signing
+from django.db import connection
+from django.utils import timezone
+from .models import Booking
+
+SALT = 'bookings.ticket'
+
+# Admissions written to the database at a time
+FLUSH_SIZE = 200
+# Seconds an admission may wait in memory before it is written
+FLUSH_INTERVAL = 2
+# Seconds before a showtime's cancellations and other gates' admissions are re-read
+REFRESH_INTERVAL = 30
+
+
+class InvalidTicket(Exception):
+    pass
+
+
+def sign_ticket(booking_id, showtime_id, seats):
+    """Return the signed token printed as the ticket's QR code."""
+    return signing.Signer(salt=SALT).sign(f'{booking_id}/{showtime_id}/{seats}')
+
+
+def read_ticket(token):
+    """Return ``(booking_id, showtime_id, seats)`` from a ticket token."""
+    try:
+        booking_id, showtime_id, seats = signing.Signer(salt=SALT).unsign(token).split('/', 2)
+        return int(booking_id), int(showtime_id), seats
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidTicket('Invalid ticket')
+
+
+class GateList:
+    """
+    Which bookings of a showtime may still enter, kept in memory.
+
+    Scans never touch the database: the showtime's admitted and cancelled
+    bookings are read once and re-read every ``REFRESH_INTERVAL`` seconds,
+    and new admissions are written back in batches.
+    """
+
+    def __init__(self, showtime_id):
+        self.showtime_id = showtime_id
+        self.admitted = set()
+        self.revoked = set()
+        self.loaded_at = None
+
+    def refresh(self):
+        bookings = Booking.objects.filter(
+            showtime_id=self.showtime_id
+        ).exclude(
+            status='CONFIRMED', checked_in_at__isnull=True
+        ).values_list('id', 'status', 'checked_in_at')
+
+        revoked = set()
+        for booking_id, status, checked_in_at in bookings:
+            if checked_in_at is not None:
+                self.admitted.add(booking_id)
+            elif status != 'CONFIRMED':
+                revoked.add(booking_id)
+        self.revoked = revoked
+        self.loaded_at = time.monotonic()
+
+
+class CheckIn:
+    """
+    Admits scanned tickets and persists admissions in batches.
+
+    A batch is written once it holds ``FLUSH_SIZE`` admissions, and a
+    timer writes it ``FLUSH_INTERVAL`` seconds after its first admission
+    even if no other ticket is scanned.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.gates = {}
+        self.pending = []
+        self.pending_since = None
+        self.timer = None
+
+    def admit(self, token, showtime_id):
+        """
+        Admit the ticket ``token`` at a gate for ``showtime_id``.
+
+        Returns ``(admitted, booking_id, seats)``; ``admitted`` is False
+        when the ticket was already used. Raises ``InvalidTicket`` for
+        forged, cancelled or wrong-showtime tickets.
+        """
+        booking_id, ticket_showtime_id, seats = read_ticket(token)
+        if ticket_showtime_id != showtime_id:
+            raise InvalidTicket('Ticket is for another showtime')
+
+        with self.lock:
+            gate = self._gate(showtime_id)
+            if booking_id in gate.revoked:
+                raise InvalidTicket('Booking was cancelled')
+            if booking_id in gate.admitted:
+                return False, booking_id, seats
+            gate.admitted.add(booking_id)
+            self.pending.append(booking_id)
+            if self.pending_since is None:
+                self.pending_since = time.monotonic()
+                self.timer = threading.Timer(FLUSH_INTERVAL, self._flush_on_timer)
+                self.timer.daemon = True
+                self.timer.start()
+            due = (len(self.pending) >= FLUSH_SIZE
+                   or time.monotonic() - self.pending_since >= FLUSH_INTERVAL)
+
+        if due:
+            self.flush()
+        return True, booking_id, seats
+
+    def _gate(self, showtime_id):
+        gate = self.gates.get(showtime_id)
+        if gate is None:
+            gate = self.gates[showtime_id] = GateList(showtime_id)
+        if gate.loaded_at is None or time.monotonic() - gate.loaded_at >= REFRESH_INTERVAL:
+            gate.refresh()
+        return gate
+
+    def flush(self):
+        with self.lock:
+            booking_ids, self.pending = self.pending, []
+            self.pending_since = None
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if booking_ids:
+            Booking.objects.filter(
+                id__in=booking_ids,
+                checked_in_at__isnull=True
+            ).update(checked_in_at=timezone.now())
+        return len(booking_ids)
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread's connection is never reused
+            connection.close()
+
+
+check_in = CheckIn()
+atexit.register(check_in.flush)
@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.utils import timezone
+from .models import Booking
+from .reservations import release_bookings
+
+EXPIRY_REASON = 'Payment deadline passed'
+
+
+def pending_holds(now=None):
+    """PENDING bookings past their payment deadline, oldest deadline first."""
+    now = now or timezone.now()
+    return Booking.objects.filter(
+        status='PENDING',
+        payment_deadline__lt=now
+    ).order_by('payment_deadline')
+
+
+def expire_holds(now=None, batch_size=5000):
+    """
+    Expire one batch of stale PENDING bookings and release their seats.
+
+    Each batch is a fixed handful of set-based statements no matter how
+    many bookings it covers. Returns ``(bookings, seats)`` released.
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        booking_ids = list(
+            pending_holds(now).select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+        )
+        released, seats = release_bookings(booking_ids, 'EXPIRED', EXPIRY_REASON, now)
+
+    return len(released), seats
+
+
+def expire_all_holds(now=None, batch_size=5000):
+    """Run ``expire_holds`` until no stale holds remain."""
+    now = now or timezone.now()
+    total_bookings = total_seats = 0
+    while True:
+        bookings, seats = expire_holds(now, batch_size)
+        total_bookings += bookings
+        total_seats += seats
+        if bookings < batch_size:
+            return total_bookings, total_seats
@@ -0,0 +1,112 @@
+import time
+from array import array
+from django.core.cache import cache
+from .models import Seat
+
+VERSION_KEY = 'seatlayout:version:%s'
+LAYOUT_KEY = 'seatlayout:%s:%s'
+
+# Layouts already decoded by this process, keyed by (theater_id, version)
+_decoded = {}
+
+
+class SeatLayout:
+    """
+    Active seats of a theater in (row, number) order.
+
+    A seat's position in this ordering is what seat maps index by. The
+    layout is cached under a per-theater version number, so bumping the
+    version retires every copy at once.
+    """
+
+    __slots__ = ['theater_id', 'version', 'seat_ids', 'rows', 'numbers', 'seat_types', 'index']
+
+    def __init__(self, theater_id, version, seat_ids, rows, numbers, seat_types):
+        self.theater_id = theater_id
+        self.version = version
+        self.seat_ids = seat_ids
+        self.rows = rows
+        self.numbers = numbers
+        self.seat_types = seat_types
+        self.index = {seat_id: position for position, seat_id in enumerate(seat_ids)}
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+    @classmethod
+    def build(cls, theater_id, version):
+        seats = Seat.objects.filter(
+            theater_id=theater_id,
+            is_active=True
+        ).order_by('row', 'number').values_list('id', 'row', 'number', 'seat_type')
+
+        seat_ids, rows, numbers, seat_types = [], [], [], []
+        for seat_id, row, number, seat_type in seats:
+            seat_ids.append(seat_id)
+            rows.append(row)
+            numbers.append(number)
+            seat_types.append(seat_type)
+        return cls(theater_id, version, seat_ids, rows, numbers, seat_types)
+
+    @classmethod
+    def for_theater(cls, theater_id):
+        version = current_version(theater_id)
+        layout = _decoded.get((theater_id, version))
+        if layout is not None:
+            return layout
+
+        data = cache.get(LAYOUT_KEY % (theater_id, version))
+        if data is not None:
+            layout = cls.loads(theater_id, version, data)
+        else:
+            layout = cls.build(theater_id, version)
+            cache.set(LAYOUT_KEY % (theater_id, version), layout.dumps(), None)
+
+        if len(_decoded) > 256:
+            _decoded.clear()
+        _decoded[(theater_id, version)] = layout
+        return layout
+
+    def dumps(self):
+        row_labels = list(dict.fromkeys(self.rows))
+        type_labels = list(dict.fromkeys(self.seat_types))
+        row_codes = {label: code for code, label in enumerate(row_labels)}
+        type_codes = {label: code for code, label in enumerate(type_labels)}
+        return (
+            array('q', self.seat_ids).tobytes(),
+            row_labels,
+            array('H', [row_codes[row] for row in self.rows]).tobytes(),
+            array('L', self.numbers).tobytes(),
+            type_labels,
+            bytes(type_codes[seat_type] for seat_type in self.seat_types),
+        )
+
+    @classmethod
+    def loads(cls, theater_id, version, data):
+        seat_ids, row_labels, row_codes, numbers, type_labels, type_codes = data
+        return cls(
+            theater_id,
+            version,
+            array('q', seat_ids).tolist(),
+            [row_labels[code] for code in array('H', row_codes)],
+            array('L', numbers).tolist(),
+            [type_labels[code] for code in type_codes],
+        )
+
+
+def current_version(theater_id):
+    version = cache.get(VERSION_KEY % theater_id)
+    if version is None:
+        # Start from the clock so a flushed cache never reuses an old version
+        version = time.time_ns() // 1000
+        cache.add(VERSION_KEY % theater_id, version, None)
+        version = cache.get(VERSION_KEY % theater_id, version)
+    return version
+
+
+def invalidate_layout(*theater_ids):
+    for theater_id in theater_ids:
+        try:
+            cache.incr(VERSION_KEY % theater_id)
+        except ValueError:
+            cache.set(VERSION_KEY % theater_id, time.time_ns() // 1000, None)
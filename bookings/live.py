@@ -0,0 +1,211 @@
+import asyncio
+import json
+import re
+import socket
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+PATH_RE = re.compile(r'^/live/showtimes/(?P<showtime_id>\d+)/$')
+
+# Seconds between keep-alive comments on idle streams
+HEARTBEAT = 15
+# Events buffered per client before it is told to resync
+QUEUE_SIZE = 64
+
+RESYNC = json.dumps({'type': 'resync'})
+
+
+class SeatEventHub:
+    """
+    Fans seat events out to the clients of this worker.
+
+    Subscribers are bounded asyncio queues owned by the worker's event
+    loop; ``dispatch`` may be called from any thread.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.subscribers = {}
+
+    def subscribe(self, showtime_id):
+        self.loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self.subscribers.setdefault(showtime_id, set()).add(queue)
+        get_backend().attach(self)
+        return queue
+
+    def unsubscribe(self, showtime_id, queue):
+        queues = self.subscribers.get(showtime_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[showtime_id]
+
+    def dispatch(self, showtime_id, message):
+        loop = self.loop
+        if loop is None or showtime_id not in self.subscribers:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(showtime_id, message)
+        else:
+            loop.call_soon_threadsafe(self._deliver, showtime_id, message)
+
+    def _deliver(self, showtime_id, message):
+        for queue in self.subscribers.get(showtime_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A client this far behind reloads the seat map instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+
+hub = SeatEventHub()
+
+
+class InProcessBackend:
+    """Delivers events to clients connected to the publishing worker only."""
+
+    def attach(self, hub):
+        pass
+
+    def publish(self, showtime_id, message):
+        hub.dispatch(showtime_id, message)
+
+
+class BrokerBackend:
+    """
+    Shares events between workers through ``seat_event_broker``.
+
+    Publishers write one JSON line per event; each worker keeps a single
+    subscription connection and feeds what it reads into its hub.
+    """
+
+    def __init__(self):
+        self.address = tuple(getattr(settings, 'SEAT_EVENTS_BROKER', ('127.0.0.1', 8765)))
+        self.lock = threading.Lock()
+        self.sock = None
+        self.listener = None
+
+    def attach(self, hub):
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.get_running_loop().create_task(self._listen(hub))
+
+    async def _listen(self, hub):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(*self.address)
+                writer.write(b'SUBSCRIBE\n')
+                await writer.drain()
+                while line := await reader.readline():
+                    showtime_id, _, message = line.decode().rstrip('\n').partition(' ')
+                    hub.dispatch(int(showtime_id), message)
+            except (OSError, ValueError):
+                pass
+            await asyncio.sleep(1)
+
+    def publish(self, showtime_id, message):
+        line = f'{showtime_id} {message}\n'.encode()
+        with self.lock:
+            for _ in range(2):
+                try:
+                    if self.sock is None:
+                        self.sock = socket.create_connection(self.address, timeout=1)
+                    self.sock.sendall(line)
+                    return
+                except OSError:
+                    if self.sock is not None:
+                        self.sock.close()
+                    self.sock = None
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(
+            getattr(settings, 'SEAT_EVENTS_BACKEND', 'bookings.live.InProcessBackend')
+        )()
+    return _backend
+
+
+def publish_seat_changes(showtime_id, booked=(), released=()):
+    """Announce seat changes to live clients once the transaction commits."""
+    message = json.dumps({
+        'type': 'seats',
+        'showtime': showtime_id,
+        'booked': list(booked),
+        'released': list(released),
+    })
+    transaction.on_commit(lambda: get_backend().publish(showtime_id, message))
+
+
+async def seat_events_app(scope, receive, send):
+    """
+    ASGI app streaming seat events for ``/live/showtimes/<id>/``.
+
+    Plain HTTP requests get a server-sent event stream; WebSocket clients
+    get one text frame per event.
+    """
+    match = PATH_RE.match(scope['path'])
+    if scope['type'] == 'websocket':
+        if (await receive())['type'] != 'websocket.connect':
+            return
+        if not match:
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        await send({'type': 'websocket.accept'})
+    elif not match:
+        await send({'type': 'http.response.start', 'status': 404, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    else:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+
+    showtime_id = int(match['showtime_id'])
+    queue = hub.subscribe(showtime_id)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, disconnected}, timeout=HEARTBEAT,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                getter.cancel()
+                return
+            message = getter.result() if getter in done else None
+            if not done:
+                getter.cancel()
+
+            if scope['type'] == 'websocket':
+                if message is not None:
+                    await send({'type': 'websocket.send', 'text': message})
+            elif message is None:
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+            else:
+                await send({'type': 'http.response.body', 'body': f'data: {message}\n\n'.encode(), 'more_body': True})
+    finally:
+        disconnected.cancel()
+        hub.unsubscribe(showtime_id, queue)
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] not in ('http.disconnect', 'websocket.disconnect'):
+        pass
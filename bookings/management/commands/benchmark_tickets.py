@@ -0,0 +1,53 @@
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from bookings.checkin import sign_ticket
+from bookings.tickets import get_template, render_ticket_pdf, render_tickets_pdf
+
+
+def sample_fields(count):
+    return [{
+        'booking_id': str(uuid.uuid4()),
+        'movie': f'Sample Movie {i}',
+        'theater': 'Screen 1',
+        'location': 'Downtown',
+        'date': 'Saturday, January 01, 2000',
+        'time': '07:30 PM',
+        'seats': ', '.join(f'F{n}' for n in range(1, i % 6 + 2)),
+        'customer': f'Customer {i}',
+        'total_amount': f'${12 * (i % 6 + 1)}.00',
+        'qr': sign_ticket(i, 1, ','.join(f'F{n}' for n in range(1, i % 6 + 2))),
+    } for i in range(count)]
+
+
+class Command(BaseCommand):
+    help = 'Measure ticket PDF rendering throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500,
+                            help='Tickets to render per measurement')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Tickets per PDF in the batch measurement')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        batch_size = options['batch_size']
+        tickets = sample_fields(count)
+
+        # Build the static template outside the timed runs
+        get_template()
+
+        started = time.perf_counter()
+        for fields in tickets:
+            render_ticket_pdf(fields)
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for start in range(0, count, batch_size):
+            render_tickets_pdf(tickets[start:start + batch_size])
+        batch = time.perf_counter() - started
+
+        self.stdout.write(f'single: {count} tickets in {single:.2f}s ({count / single:.0f} tickets/s)')
+        self.stdout.write(
+            f'batch of {batch_size}: {count} tickets in {batch:.2f}s ({count / batch:.0f} tickets/s)'
+        )
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.holds import expire_all_holds
+
+
+class Command(BaseCommand):
+    help = 'Expire PENDING bookings past their payment deadline and release their seats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Bookings expired per transaction')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, sweeping every N seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            bookings, seats = expire_all_holds(batch_size=options['batch_size'])
+            elapsed = time.monotonic() - started
+
+            if bookings:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Expired {bookings} bookings and released {seats} seats in {elapsed:.2f}s'
+                ))
+            elif not options['interval']:
+                self.stdout.write('No expired holds found')
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
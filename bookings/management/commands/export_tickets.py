@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from bookings.models import Booking
+from bookings.tickets import iter_tickets_zip
+
+
+class Command(BaseCommand):
+    help = 'Write a ZIP of the tickets of confirmed bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('booking_ids', nargs='*', metavar='booking_id',
+                            help='Booking ids (UUIDs) to export')
+        parser.add_argument('--showtime', type=int,
+                            help='Export every confirmed booking of this showtime')
+        parser.add_argument('--output', required=True,
+                            help='Path of the ZIP file to write')
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.filter(status='CONFIRMED')
+        if options['showtime']:
+            bookings = bookings.filter(showtime_id=options['showtime'])
+        elif options['booking_ids']:
+            bookings = bookings.filter(booking_id__in=options['booking_ids'])
+        else:
+            raise CommandError('Give booking ids or --showtime')
+
+        bookings = bookings.select_related(
+            'showtime__movie', 'showtime__theater', 'user'
+        ).order_by('id')
+
+        total = bookings.count()
+        if not total:
+            raise CommandError('No confirmed bookings found')
+
+        started = time.monotonic()
+        with open(options['output'], 'wb') as output:
+            for chunk in iter_tickets_zip(bookings.iterator(chunk_size=100)):
+                output.write(chunk)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {total} tickets to {options["output"]} in {elapsed:.2f}s'
+        ))
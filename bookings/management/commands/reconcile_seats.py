@@ -0,0 +1,56 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+from movies.models import Showtime
+from bookings.models import Booking
+from bookings.reservations import restore_available_seats
+from bookings.seatmap import invalidate
+
+
+class Command(BaseCommand):
+    help = 'Repair Showtime.available_seats counters that drifted from the booked seats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without repairing it')
+        parser.add_argument('--since', type=int, metavar='MINUTES',
+                            help='Only check showtimes with bookings made or cancelled in the last N minutes')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        showtimes = Showtime.objects.all()
+
+        if options['since']:
+            cutoff = timezone.now() - timezone.timedelta(minutes=options['since'])
+            # A UNION of two range lookups, each served by its own index
+            recent = Booking.objects.filter(booking_time__gte=cutoff).order_by().values_list('showtime_id')
+            cancelled = Booking.objects.filter(cancellation_time__gte=cutoff).order_by().values_list('showtime_id')
+            showtimes = showtimes.filter(id__in=[showtime_id for showtime_id, in recent.union(cancelled)])
+
+        rows = showtimes.order_by().annotate(
+            booked=Count('bookingseat', filter=Q(bookingseat__is_booked=True))
+        ).values_list('id', 'available_seats', 'theater__total_seats', 'booked')
+
+        checked = 0
+        drift = {}
+        for showtime_id, available, total_seats, booked in rows:
+            checked += 1
+            expected = max(total_seats - booked, 0)
+            if available != expected:
+                drift[showtime_id] = expected - available
+                self.stdout.write(
+                    f'  Showtime {showtime_id}: counter {available}, expected {expected} '
+                    f'({expected - available:+d})'
+                )
+
+        if drift and not options['dry_run']:
+            # Apply deltas rather than absolute values so concurrent bookings are not lost
+            restore_available_seats(drift)
+            invalidate(*drift)
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} drift on {len(drift)} of {checked} showtimes '
+            f'in {time.monotonic() - started:.2f}s'
+        ))
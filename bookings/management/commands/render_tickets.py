@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.ticket_queue import queued_tickets, render_tickets
+
+
+class Command(BaseCommand):
+    help = 'Render queued tickets of confirmed bookings in the background pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Tickets submitted to the pool at a time')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, draining the queue every N seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            booking_ids = queued_tickets()
+            batch_size = options['batch_size']
+            rendered = 0
+            for start in range(0, len(booking_ids), batch_size):
+                rendered += render_tickets(booking_ids[start:start + batch_size])
+            elapsed = time.monotonic() - started
+
+            if rendered:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Rendered {rendered} tickets in {elapsed:.2f}s'
+                ))
+            elif not options['interval']:
+                self.stdout.write('No queued tickets found')
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
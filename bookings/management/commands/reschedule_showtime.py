@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from movies.models import Showtime
+from bookings.reservations import SeatUnavailable
+from bookings.showtimes import move_showtime, void_showtime
+
+
+class Command(BaseCommand):
+    help = 'Cancel every booking of a showtime, or move them to another showtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('showtime_id', type=int)
+        parser.add_argument('--to', type=int, dest='target_id',
+                            help='Move bookings to this showtime instead of cancelling them')
+        parser.add_argument('--reason', default='',
+                            help='Cancellation reason recorded on the bookings')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Bookings processed per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            source = Showtime.objects.get(id=options['showtime_id'])
+            target = Showtime.objects.get(id=options['target_id']) if options['target_id'] else None
+        except Showtime.DoesNotExist as e:
+            raise CommandError(str(e))
+
+        def progress(result):
+            self.stdout.write(
+                f'  {result.processed}/{result.total} bookings '
+                f'({result.rate:.0f}/s, {result.seats} seats)'
+            )
+
+        if target:
+            self.stdout.write(f'Moving bookings from {source} to {target}')
+            try:
+                result = move_showtime(
+                    source, target,
+                    reason=options['reason'] or 'Showtime rescheduled',
+                    batch_size=options['batch_size'],
+                    progress=progress
+                )
+            except SeatUnavailable as e:
+                raise CommandError(str(e))
+        else:
+            self.stdout.write(f'Cancelling bookings for {source}')
+            result = void_showtime(
+                source,
+                reason=options['reason'] or 'Showtime cancelled',
+                batch_size=options['batch_size'],
+                progress=progress
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {result}'))
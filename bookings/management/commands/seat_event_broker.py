@@ -0,0 +1,49 @@
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Subscribers buffering more than this are too slow and get disconnected
+MAX_BUFFER = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Run the local broker that relays live seat events between ASGI workers'
+
+    def add_arguments(self, parser):
+        host, port = getattr(settings, 'SEAT_EVENTS_BROKER', ('127.0.0.1', 8765))
+        parser.add_argument('--host', default=host)
+        parser.add_argument('--port', type=int, default=port)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.serve(options['host'], options['port']))
+
+    async def serve(self, host, port):
+        subscribers = set()
+
+        async def handle_connection(reader, writer):
+            try:
+                first = await reader.readline()
+                if first == b'SUBSCRIBE\n':
+                    subscribers.add(writer)
+                    await reader.read()
+                    return
+
+                line = first
+                while line:
+                    for subscriber in list(subscribers):
+                        if subscriber.transport.get_write_buffer_size() > MAX_BUFFER:
+                            subscribers.discard(subscriber)
+                            subscriber.close()
+                        else:
+                            subscriber.write(line)
+                    line = await reader.readline()
+            except ConnectionError:
+                pass
+            finally:
+                subscribers.discard(writer)
+                writer.close()
+
+        server = await asyncio.start_server(handle_connection, host, port)
+        self.stdout.write(self.style.SUCCESS(f'Seat event broker listening on {host}:{port}'))
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'payment_deadline'], name='bookings_bo_status_b895c9_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_booking_checked_in_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'booking_time'], name='bookings_bo_user_id_9e19ed_idx'),
+        ),
+    ]
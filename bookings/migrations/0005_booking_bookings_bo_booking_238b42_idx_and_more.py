@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_bookings_bo_user_id_9e19ed_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['booking_time'], name='bookings_bo_booking_238b42_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['cancellation_time'], name='bookings_bo_cancell_e354e1_idx'),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from movies.models import Showtime, Theater
 import uuid
+from decimal import Decimal
+from django.db import transaction
 from django.utils import timezone
 
 
@@ -43,9 +47,17 @@ class Booking(models.Model):
     confirmation_time = models.DateTimeField(null=True, blank=True)
     cancellation_time = models.DateTimeField(null=True, blank=True)
     cancellation_reason = models.TextField(blank=True)
+    checked_in_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-booking_time']
+        indexes = [
+            models.Index(fields=['status', 'payment_deadline']),
+            models.Index(fields=['user', 'booking_time']),
+            # reconcile_seats --since looks up recent bookings and cancellations
+            models.Index(fields=['booking_time']),
+            models.Index(fields=['cancellation_time']),
+        ]
 
     def __str__(self):
         return f"Booking {self.booking_id} - {self.user.username}"
@@ -65,19 +77,61 @@ class Booking(models.Model):
         return [str(booking_seat.seat) for booking_seat in self.booking_seats.all()]
 
     def cancel_booking(self, reason=""):
+        from .reservations import release_bookings
+
+        now = timezone.now()
+        released, seats = release_bookings([self.pk], 'CANCELLED', reason, now)
+        if not released:
+            # Already cancelled or expired; keep what the database says
+            self.refresh_from_db(fields=['status', 'cancellation_time', 'cancellation_reason'])
+            return False
         self.status = 'CANCELLED'
-        self.cancellation_time = timezone.now()
+        self.cancellation_time = now
         self.cancellation_reason = reason
-        self.save()
-
-        # Release seats
-        for booking_seat in self.booking_seats.all():
-            booking_seat.is_booked = False
-            booking_seat.save()
-
-        # Update available seats in showtime
-        self.showtime.available_seats += self.booking_seats.count()
-        self.showtime.save()
+        return True
+
+    def cancel_seats(self, seat_ids, reason=""):
+        """
+        Release some of this booking's seats and prorate ``total_amount``.
+
+        Releasing the last seat cancels the whole booking instead.
+        Returns the number of seats released.
+        """
+        from .live import publish_seat_changes
+        from .reservations import restore_available_seats
+        from .seatmap import invalidate
+
+        with transaction.atomic():
+            booking = Booking.objects.select_for_update().filter(
+                pk=self.pk,
+                status__in=['PENDING', 'CONFIRMED']
+            ).first()
+            if booking is None:
+                return 0
+            held = booking.booking_seats.filter(is_booked=True).count()
+            # Only this booking's held seats among ``seat_ids``; the lock keeps them held
+            own_seat_ids = list(booking.booking_seats.filter(
+                seat_id__in=seat_ids,
+                is_booked=True
+            ).values_list('seat_id', flat=True))
+            released = booking.booking_seats.filter(seat_id__in=own_seat_ids, is_booked=True).update(is_booked=False)
+            if not released:
+                return 0
+            publish_seat_changes(self.showtime_id, released=own_seat_ids)
+
+            remaining = held - released
+            if remaining:
+                self.total_amount = (booking.total_amount * remaining / held).quantize(Decimal('0.01'))
+                self.save(update_fields=['total_amount'])
+            else:
+                self.status = 'CANCELLED'
+                self.cancellation_time = timezone.now()
+                self.cancellation_reason = reason
+                self.save(update_fields=['status', 'cancellation_time', 'cancellation_reason'])
+            restore_available_seats({self.showtime_id: released})
+
+        invalidate(self.showtime_id)
+        return released
 
 
 class BookingSeat(models.Model):
@@ -92,3 +146,15 @@ class BookingSeat(models.Model):
 
     def __str__(self):
         return f"{self.booking.booking_id} - {self.seat}"
+
+
+@receiver([post_save, post_delete], sender=Seat)
+def invalidate_seat_layout(sender, instance, **kwargs):
+    from .layout import invalidate_layout
+    invalidate_layout(instance.theater_id)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def discard_ticket_cache(sender, instance, **kwargs):
+    from .tickets import discard_cached_tickets
+    discard_cached_tickets(instance.booking_id)
@@ -0,0 +1,149 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from movies.models import Showtime
+from .live import publish_seat_changes
+from .models import Booking, BookingSeat
+from .seatmap import invalidate
+
+
+class SeatUnavailable(Exception):
+    pass
+
+
+def reserve_seats(user, showtime, seat_ids):
+    """
+    Claim ``seat_ids`` on ``showtime`` for ``user`` and return the new
+    PENDING booking.
+
+    The showtime counter is decremented with a conditional update and the
+    seats are inserted in bulk, so the ``(seat, showtime)`` unique
+    constraint rejects any seat that was claimed concurrently. The query
+    count does not depend on how many seats are requested. The cached
+    seat map is dropped when the booking commits.
+    """
+    seat_ids = set(seat_ids)
+    if not seat_ids:
+        raise SeatUnavailable('No seats selected')
+
+    try:
+        with transaction.atomic():
+            claimed = Showtime.objects.filter(
+                id=showtime.id,
+                available_seats__gte=len(seat_ids)
+            ).update(available_seats=F('available_seats') - len(seat_ids))
+            if not claimed:
+                raise SeatUnavailable('Not enough seats available')
+
+            # Rows left behind by cancelled bookings would trip the unique constraint
+            BookingSeat.objects.filter(
+                showtime_id=showtime.id,
+                seat_id__in=seat_ids,
+                is_booked=False
+            ).delete()
+
+            booking = Booking.objects.create(
+                user=user,
+                showtime=showtime,
+                total_amount=showtime.price * len(seat_ids),
+                status='PENDING'
+            )
+            BookingSeat.objects.bulk_create([
+                BookingSeat(
+                    booking=booking,
+                    seat_id=seat_id,
+                    showtime_id=showtime.id,
+                    is_booked=True
+                )
+                for seat_id in seat_ids
+            ])
+            publish_seat_changes(showtime.id, booked=seat_ids)
+            # Any cached map predates the booking, so drop it once it is visible
+            transaction.on_commit(lambda: invalidate(showtime.id))
+    except IntegrityError:
+        raise SeatUnavailable('Some seats are already booked')
+
+    return booking
+
+
+def restore_available_seats(released):
+    """
+    Add seats back to ``Showtime.available_seats`` in a single UPDATE.
+
+    ``released`` maps showtime ids to the number of seats given back;
+    negative counts take seats away.
+    """
+    released = {showtime_id: count for showtime_id, count in released.items() if count}
+    if not released:
+        return
+    Showtime.objects.filter(id__in=released).update(
+        available_seats=F('available_seats') + Case(
+            *[When(id=showtime_id, then=Value(count)) for showtime_id, count in released.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+    )
+
+
+def release_bookings(booking_ids, status='CANCELLED', reason='', now=None):
+    """
+    Move the PENDING or CONFIRMED bookings among ``booking_ids`` to
+    ``status`` and give their seats back.
+
+    The bookings are locked first, so a booking released concurrently,
+    or already cancelled or expired, is skipped rather than credited
+    twice. Seats are credited by the rows each UPDATE actually changed.
+    Runs one statement per showtime plus four. Returns ``(booking_ids,
+    seats)`` released.
+    """
+    now = now or timezone.now()
+    booking_ids = list(booking_ids)
+    if not booking_ids:
+        return [], 0
+
+    with transaction.atomic():
+        booking_ids = list(Booking.objects.select_for_update().filter(
+            id__in=booking_ids,
+            status__in=['PENDING', 'CONFIRMED']
+        ).order_by().values_list('id', flat=True))
+        if not booking_ids:
+            return [], 0
+
+        seats = BookingSeat.objects.filter(booking_id__in=booking_ids, is_booked=True)
+        seats_by_showtime = {}
+        for showtime_id, seat_id in seats.values_list('showtime_id', 'seat_id'):
+            seats_by_showtime.setdefault(showtime_id, []).append(seat_id)
+
+        released = {
+            showtime_id: seats.filter(showtime_id=showtime_id).update(is_booked=False)
+            for showtime_id in seats_by_showtime
+        }
+        Booking.objects.filter(id__in=booking_ids).update(
+            status=status,
+            cancellation_time=now,
+            cancellation_reason=reason
+        )
+        restore_available_seats(released)
+        for showtime_id, seat_ids in seats_by_showtime.items():
+            publish_seat_changes(showtime_id, released=seat_ids)
+
+    invalidate(*seats_by_showtime)
+    return booking_ids, sum(released.values())
+
+
+def cancel_bookings(bookings, reason='', batch_size=1000):
+    """
+    Cancel every PENDING or CONFIRMED booking in the ``bookings`` queryset.
+
+    Work is split into transactions of ``batch_size`` bookings. Returns
+    ``(bookings, seats)`` cancelled.
+    """
+    booking_ids = list(
+        bookings.filter(status__in=['PENDING', 'CONFIRMED']).order_by().values_list('id', flat=True)
+    )
+    bookings = seats = 0
+    for start in range(0, len(booking_ids), batch_size):
+        released, released_seats = release_bookings(booking_ids[start:start + batch_size], 'CANCELLED', reason)
+        bookings += len(released)
+        seats += released_seats
+    return bookings, seats
@@ -0,0 +1,129 @@
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from .layout import SeatLayout
+from .models import BookingSeat
+
+
+SeatInfo = namedtuple('SeatInfo', ['id', 'row', 'number', 'seat_type', 'is_booked'])
+
+CACHE_KEY = 'seatmap:%s'
+
+
+class SeatMap:
+    """
+    Seat availability for one showtime, stored as one bit per seat.
+
+    Bits are indexed by position in the theater's ``SeatLayout``; only the
+    bits and the layout version they were built against are cached.
+    """
+
+    __slots__ = ['showtime_id', 'layout', 'bits']
+
+    def __init__(self, showtime_id, layout, bits=None):
+        self.showtime_id = showtime_id
+        self.layout = layout
+        self.bits = bits if bits is not None else bytearray((len(layout) + 7) // 8)
+
+    def __len__(self):
+        return len(self.layout)
+
+    @property
+    def seat_ids(self):
+        return self.layout.seat_ids
+
+    @property
+    def rows(self):
+        return self.layout.rows
+
+    @property
+    def numbers(self):
+        return self.layout.numbers
+
+    @property
+    def seat_types(self):
+        return self.layout.seat_types
+
+    @classmethod
+    def build(cls, showtime, layout=None):
+        layout = layout or SeatLayout.for_theater(showtime.theater_id)
+        seat_map = cls(showtime.id, layout)
+        booked = BookingSeat.objects.filter(
+            showtime_id=showtime.id,
+            is_booked=True
+        ).values_list('seat_id', flat=True)
+        for seat_id in booked:
+            position = layout.index.get(seat_id)
+            if position is not None:
+                seat_map.bits[position >> 3] |= 1 << (position & 7)
+        return seat_map
+
+    @classmethod
+    def for_showtime(cls, showtime):
+        layout = SeatLayout.for_theater(showtime.theater_id)
+        cached = cache.get(CACHE_KEY % showtime.id)
+        if cached is not None and cached[0] == layout.version:
+            return cls(showtime.id, layout, bytearray(cached[1]))
+
+        seat_map = cls.build(showtime, layout)
+        seat_map.store()
+        return seat_map
+
+    def store(self):
+        cache.set(
+            CACHE_KEY % self.showtime_id,
+            (self.layout.version, bytes(self.bits)),
+            getattr(settings, 'SEAT_MAP_TTL', 5)
+        )
+
+    def position(self, seat_id):
+        return self.layout.index.get(seat_id)
+
+    def is_booked(self, position):
+        return bool(self.bits[position >> 3] & (1 << (position & 7)))
+
+    def are_available(self, seat_ids):
+        """Return True if every seat belongs to this theater and is free."""
+        index = self.layout.index
+        for seat_id in seat_ids:
+            position = index.get(seat_id)
+            if position is None or self.is_booked(position):
+                return False
+        return True
+
+    def book(self, seat_ids):
+        for seat_id in seat_ids:
+            position = self.layout.index[seat_id]
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def release(self, seat_ids):
+        for seat_id in seat_ids:
+            position = self.layout.index.get(seat_id)
+            if position is not None:
+                self.bits[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+
+    @property
+    def booked_count(self):
+        return sum(bin(byte).count('1') for byte in self.bits)
+
+    @property
+    def available_count(self):
+        return len(self.layout) - self.booked_count
+
+    def booked_seat_ids(self):
+        return [seat_id for position, seat_id in enumerate(self.layout.seat_ids) if self.is_booked(position)]
+
+    def seats(self):
+        layout = self.layout
+        for position, seat_id in enumerate(layout.seat_ids):
+            yield SeatInfo(
+                seat_id,
+                layout.rows[position],
+                layout.numbers[position],
+                layout.seat_types[position],
+                self.is_booked(position)
+            )
+
+
+def invalidate(*showtime_ids):
+    cache.delete_many([CACHE_KEY % showtime_id for showtime_id in showtime_ids])
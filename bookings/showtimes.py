@@ -0,0 +1,208 @@
+import time
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from movies.caching import invalidate_listings
+from .live import publish_seat_changes
+from .models import Seat, Booking, BookingSeat
+from .reservations import SeatUnavailable, release_bookings, restore_available_seats
+from .seatmap import invalidate
+
+
+class BulkResult:
+    def __init__(self, total):
+        self.total = total
+        self.moved = 0
+        self.cancelled = 0
+        self.seats = 0
+        self.started = time.monotonic()
+
+    @property
+    def processed(self):
+        return self.moved + self.cancelled
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.moved} moved, {self.cancelled} cancelled, {self.seats} seats '
+            f'in {self.elapsed:.2f}s ({self.rate:.0f} bookings/s)'
+        )
+
+
+def _active_booking_ids(showtime):
+    return list(
+        Booking.objects.filter(
+            showtime=showtime,
+            status__in=['PENDING', 'CONFIRMED']
+        ).order_by('id').values_list('id', flat=True)
+    )
+
+
+def _settle_payments(booking_ids, reason, now):
+    from payments.models import Payment
+
+    Payment.objects.filter(booking_id__in=booking_ids, status='COMPLETED').update(
+        status='REFUNDED',
+        refund_amount=F('amount'),
+        refund_reason=reason,
+        refunded_at=now
+    )
+    Payment.objects.filter(booking_id__in=booking_ids, status__in=['PENDING', 'PROCESSING']).update(
+        status='FAILED'
+    )
+
+
+def _void(booking_ids, reason, result):
+    now = timezone.now()
+    with transaction.atomic():
+        # Bookings cancelled or expired since the ids were read are skipped
+        released, seats = release_bookings(booking_ids, 'CANCELLED', reason, now)
+        _settle_payments(released, reason, now)
+    result.cancelled += len(released)
+    result.seats += seats
+
+
+def void_showtime(showtime, reason='Showtime cancelled', batch_size=500, progress=None):
+    """
+    Cancel every active booking on ``showtime`` in chunked transactions.
+
+    Completed payments are marked refunded and open ones failed. The
+    showtime is deactivated. ``progress`` is called with the running
+    ``BulkResult`` after each chunk.
+    """
+    booking_ids = _active_booking_ids(showtime)
+    result = BulkResult(len(booking_ids))
+    for start in range(0, len(booking_ids), batch_size):
+        _void(booking_ids[start:start + batch_size], reason, result)
+        if progress:
+            progress(result)
+
+    type(showtime).objects.filter(id=showtime.id).update(is_active=False)
+    invalidate_listings()
+    return result
+
+
+def _move(booking_ids, source, target, seat_mapping):
+    """
+    Move the bookings among ``booking_ids`` still active on ``source`` to
+    ``target`` and return ``(moved, seats, cancelled)``: the moved ids,
+    their seat count, and the ids whose seats cannot be moved.
+    """
+    with transaction.atomic():
+        # Seats booked on the target, locked so they are read as of the move
+        taken = set(
+            BookingSeat.objects.select_for_update().filter(
+                showtime=target,
+                is_booked=True
+            ).values_list('seat_id', flat=True)
+        )
+        # Bookings cancelled or expired since the ids were read are skipped
+        active = list(
+            Booking.objects.select_for_update().filter(
+                id__in=booking_ids,
+                showtime=source,
+                status__in=['PENDING', 'CONFIRMED']
+            ).order_by('id').values_list('id', flat=True)
+        )
+        seats_by_booking = {}
+        for booking_seat_id, booking_id, seat_id in BookingSeat.objects.filter(
+            booking_id__in=active,
+            is_booked=True
+        ).values_list('id', 'booking_id', 'seat_id'):
+            seats_by_booking.setdefault(booking_id, []).append((booking_seat_id, seat_id))
+
+        remap = {}
+        moved, moved_seats, cancelled = [], [], []
+        for booking_id in active:
+            seats = seats_by_booking.get(booking_id, [])
+            targets = [seat_mapping.get(seat_id) for _, seat_id in seats]
+            if None in targets or taken.intersection(targets) or len(set(targets)) != len(targets):
+                cancelled.append(booking_id)
+                continue
+            moved.append(booking_id)
+            moved_seats.extend(seats)
+            taken.update(targets)
+            for (booking_seat_id, _), target_seat_id in zip(seats, targets):
+                remap[booking_seat_id] = target_seat_id
+
+        if moved:
+            # Free rows left on the target by earlier cancellations
+            BookingSeat.objects.filter(
+                showtime=target,
+                seat_id__in=remap.values(),
+                is_booked=False
+            ).delete()
+            BookingSeat.objects.filter(id__in=remap).update(
+                showtime=target,
+                seat_id=Case(*[When(id=key, then=Value(value)) for key, value in remap.items()])
+            )
+            Booking.objects.filter(id__in=moved).update(showtime=target)
+            restore_available_seats({source.id: len(remap), target.id: -len(remap)})
+            publish_seat_changes(source.id, released=[seat_id for _, seat_id in moved_seats])
+            publish_seat_changes(target.id, booked=list(remap.values()))
+    return moved, len(remap), cancelled
+
+
+def move_showtime(source, target, reason='Showtime rescheduled', batch_size=500, progress=None):
+    """
+    Move every active booking on ``source`` to ``target``.
+
+    Seats are matched by row and number. A booking whose seats are missing
+    or already taken on ``target`` is cancelled instead, as in
+    ``void_showtime``. The source showtime is deactivated.
+
+    Raises ``SeatUnavailable`` if a seat on ``target`` is booked while a
+    chunk is being moved. That chunk is rolled back, earlier ones stay
+    moved, and running the move again picks up the remaining bookings.
+    """
+    if source.id == target.id:
+        raise ValueError('Source and target showtimes must differ')
+
+    seat_mapping = _seat_mapping(source.theater_id, target.theater_id)
+    booking_ids = _active_booking_ids(source)
+    result = BulkResult(len(booking_ids))
+    for start in range(0, len(booking_ids), batch_size):
+        try:
+            moved, seats, cancelled = _move(booking_ids[start:start + batch_size], source, target, seat_mapping)
+        except IntegrityError:
+            invalidate(source.id, target.id)
+            raise SeatUnavailable(
+                f'Seats on showtime {target.id} were booked during the move; '
+                f'{result.moved} bookings were moved, run the move again for the rest'
+            )
+        result.moved += len(moved)
+        result.seats += seats
+
+        if cancelled:
+            _void(cancelled, reason, result)
+
+        if progress:
+            progress(result)
+
+    type(source).objects.filter(id=source.id).update(is_active=False)
+    invalidate(source.id, target.id)
+    invalidate_listings()
+    return result
+
+
+def _seat_mapping(source_theater_id, target_theater_id):
+    target_seats = {
+        (row, number): seat_id
+        for seat_id, row, number in Seat.objects.filter(
+            theater_id=target_theater_id,
+            is_active=True
+        ).values_list('id', 'row', 'number')
+    }
+    return {
+        seat_id: target_seats.get((row, number))
+        for seat_id, row, number in Seat.objects.filter(
+            theater_id=source_theater_id
+        ).values_list('id', 'row', 'number')
+    }
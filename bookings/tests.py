@@ -1,3 +1,924 @@
-from django.test import TestCase
+import json
+import random
+import tempfile
+import threading
+import time as clock
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F, QuerySet
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from cinema_booking.asgi import application
+from movies.models import Movie, Theater, Showtime
+from .admin import SeatAdmin
+from .admission import _take_slot
+from .allocation import best_available
+from .checkin import CheckIn, InvalidTicket, sign_ticket
+from .checks import check_shared_cache
+from .holds import EXPIRY_REASON, expire_all_holds, pending_holds
+from .layout import SeatLayout
+from .live import hub, publish_seat_changes
+from .models import Seat, Booking, BookingSeat
+from .reservations import SeatUnavailable, release_bookings, reserve_seats
+from .seatmap import CACHE_KEY, SeatMap
+from . import layout, showtimes
+from .showtimes import move_showtime, void_showtime
+from .ticket_queue import enqueue_tickets, queued_tickets, render_tickets
+from .tickets import (
+    cache_dir, discard_cached_tickets, open_cached_ticket, store_ticket, ticket_fields, ticket_hash
+)
+from .views import BestSeatsView, BookingConfirmationView, TicketExportView
 
-# Create your tests here.
+
+def create_showtime(rows=5, seats_per_row=10):
+    theater = Theater.objects.create(
+        name='Screen 1',
+        location='Downtown',
+        total_seats=rows * seats_per_row,
+        rows=rows,
+        seats_per_row=seats_per_row
+    )
+    Seat.objects.bulk_create([
+        Seat(theater=theater, row=chr(ord('A') + row), number=number)
+        for row in range(rows)
+        for number in range(1, seats_per_row + 1)
+    ])
+    movie = Movie.objects.create(
+        title='Test Movie',
+        description='A test movie',
+        genre='ACTION',
+        rating='PG',
+        duration=120,
+        release_date=date.today(),
+        director='Director',
+        cast='Actor One, Actor Two'
+    )
+    return Showtime.objects.create(
+        movie=movie,
+        theater=theater,
+        show_date=date.today(),
+        show_time=time(20, 0),
+        price=Decimal('10.00'),
+        available_seats=theater.total_seats
+    )
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class QueryPlanTestCase(TestCase):
+    """
+    Runs views and fails if SQLite plans any of their queries as a full
+    table scan, or sorts rows that an index could return in order.
+
+    Both the queries a view runs and the querysets it leaves unevaluated
+    in its context are checked. Templates are never rendered.
+    """
+
+    def setUp(self):
+        # Cached listings and seat maps would hide the queries behind them
+        cache.clear()
+
+    def explain(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, sql, params=()):
+        plan = self.explain(sql, params)
+        full_scans = [step for step in plan if step.startswith('SCAN ') and ' USING ' not in step]
+        self.assertFalse(full_scans, f'Full table scan in {plan} for {sql}')
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, f'Unindexed sort for {sql}')
+
+    def assertViewIndexed(self, view, path='/', user=None, **kwargs):
+        request = RequestFactory().get(path)
+        request.user = user or AnonymousUser()
+        with CaptureQueriesContext(connection) as queries:
+            response = view.as_view()(request, **kwargs)
+
+        statements = [(query['sql'], ()) for query in queries if query['sql'].startswith('SELECT')]
+        for value in (getattr(response, 'context_data', None) or {}).values():
+            if isinstance(value, QuerySet) and value._result_cache is None:
+                statements.append(value.query.sql_with_params())
+        self.assertTrue(statements, f'{view.__name__} ran no queries')
+
+        for sql, params in statements:
+            with self.subTest(view=view.__name__, sql=sql):
+                self.assertIndexed(sql, params)
+        return response
+
+
+class ReserveSeatsTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret')
+        self.seat_ids = list(Seat.objects.values_list('id', flat=True))
+
+    def test_reserves_seats_and_decrements_counter(self):
+        booking = reserve_seats(self.user, self.showtime, self.seat_ids[:3])
+
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.available_seats, 47)
+        self.assertEqual(booking.total_amount, Decimal('30.00'))
+        self.assertEqual(booking.booking_seats.count(), 3)
+
+    def test_query_count_does_not_depend_on_seat_count(self):
+        with self.assertNumQueries(6):
+            reserve_seats(self.user, self.showtime, self.seat_ids[:1])
+        with self.assertNumQueries(6):
+            reserve_seats(self.user, self.showtime, self.seat_ids[1:41])
+
+    def test_rejects_seat_already_booked(self):
+        reserve_seats(self.user, self.showtime, self.seat_ids[:2])
+
+        with self.assertRaises(SeatUnavailable):
+            reserve_seats(self.user, self.showtime, self.seat_ids[1:3])
+
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.available_seats, 48)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_rejects_when_capacity_exhausted(self):
+        Showtime.objects.filter(id=self.showtime.id).update(available_seats=1)
+
+        with self.assertRaises(SeatUnavailable):
+            reserve_seats(self.user, self.showtime, self.seat_ids[:2])
+
+        self.assertFalse(BookingSeat.objects.exists())
+
+    def test_released_seats_can_be_booked_again(self):
+        booking = reserve_seats(self.user, self.showtime, self.seat_ids[:2])
+        booking.cancel_booking('Changed plans')
+
+        reserve_seats(self.user, self.showtime, self.seat_ids[:2])
+
+        self.assertEqual(BookingSeat.objects.filter(is_booked=True).count(), 2)
+
+    def test_booking_drops_cached_seat_map(self):
+        cache.clear()
+        seats = best_available(SeatMap.for_showtime(self.showtime), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.user, self.showtime, seats)
+
+        self.assertIsNone(cache.get(CACHE_KEY % self.showtime.id))
+        self.assertFalse(set(seats) & set(best_available(SeatMap.for_showtime(self.showtime), 4)))
+
+
+class BestAvailableTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret')
+        self.seats = {f'{row}{number}': seat_id for seat_id, row, number in Seat.objects.values_list('id', 'row', 'number')}
+        self.names = {seat_id: name for name, seat_id in self.seats.items()}
+
+    def book(self, *names):
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_seats(self.user, self.showtime, [self.seats[name] for name in names])
+
+    def best(self, count, seat_type=None):
+        seat_ids = best_available(SeatMap.for_showtime(self.showtime), count, seat_type)
+        return seat_ids and [self.names[seat_id] for seat_id in seat_ids]
+
+    def test_picks_centre_of_ideal_row(self):
+        self.assertEqual(self.best(2), ['C5', 'C6'])
+        self.assertEqual(self.best(3), ['C4', 'C5', 'C6'])
+
+    def test_row_penalty_outweighs_distance_from_centre(self):
+        self.book('C3', 'C4', 'C5', 'C6', 'C7', 'C8')
+
+        # The edge of the ideal row loses to the centre of the next row back
+        self.assertEqual(self.best(2), ['D5', 'D6'])
+
+    def test_prefers_requested_seat_type(self):
+        Seat.objects.filter(row='A').update(seat_type='VIP')
+
+        self.assertEqual(self.best(2, 'VIP'), ['A5', 'A6'])
+        self.assertEqual(self.best(2), ['C5', 'C6'])
+
+    def test_falls_back_when_requested_type_is_full(self):
+        Seat.objects.filter(row='A').update(seat_type='VIP')
+        self.book(*[f'A{number}' for number in range(2, 11)])
+
+        self.assertEqual(self.best(2, 'VIP'), ['C5', 'C6'])
+        self.assertEqual(self.best(2, 'PREMIUM'), ['C5', 'C6'])
+
+    def test_prefers_block_with_fewer_seats_of_other_types(self):
+        Seat.objects.filter(row='B', number__gte=7).update(seat_type='VIP')
+
+        self.assertEqual(self.best(4, 'VIP'), ['B7', 'B8', 'B9', 'B10'])
+        self.book('B9', 'B10')
+        self.assertEqual(self.best(4, 'VIP'), ['B5', 'B6', 'B7', 'B8'])
+
+    def test_none_when_no_block_is_free(self):
+        self.assertIsNone(self.best(11))
+
+
+class SeatLayoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret')
+        self.theater_id = self.showtime.theater_id
+        self.seat_map = SeatMap.for_showtime(self.showtime)
+
+    def seat(self, name):
+        return Seat.objects.get(theater_id=self.theater_id, row=name[0], number=int(name[1:]))
+
+    def run_action(self, action, names):
+        request = RequestFactory().post('/')
+        queryset = Seat.objects.filter(id__in=[self.seat(name).id for name in names])
+        with patch.object(SeatAdmin, 'message_user'):
+            getattr(SeatAdmin(Seat, admin.site), action)(request, queryset)
+
+    def test_saving_a_seat_bumps_the_version(self):
+        seat = self.seat('C5')
+        seat.seat_type = 'VIP'
+        seat.save()
+
+        seat_map = SeatMap.for_showtime(self.showtime)
+        self.assertGreater(seat_map.layout.version, self.seat_map.layout.version)
+        self.assertEqual(seat_map.seat_types[seat_map.position(seat.id)], 'VIP')
+
+    def test_deactivated_seat_leaves_rebuilt_map(self):
+        booked = self.seat('D5')
+        reserve_seats(self.user, self.showtime, [booked.id])
+        seat = self.seat('A1')
+        seat.is_active = False
+        seat.save()
+
+        seat_map = SeatMap.for_showtime(self.showtime)
+        self.assertEqual(len(seat_map), 49)
+        self.assertIsNone(seat_map.position(seat.id))
+        # Positions shifted, yet the booking stays on its own seat
+        self.assertFalse(seat_map.are_available([booked.id]))
+        self.assertTrue(seat_map.are_available([self.seat('D4').id, self.seat('D6').id]))
+
+    def test_admin_bulk_actions_bump_the_version(self):
+        self.run_action('make_vip', ['A1', 'A2'])
+        seat_map = SeatMap.for_showtime(self.showtime)
+        self.assertGreater(seat_map.layout.version, self.seat_map.layout.version)
+        self.assertEqual(seat_map.seat_types[seat_map.position(self.seat('A2').id)], 'VIP')
+
+        self.run_action('deactivate', ['E9', 'E10'])
+        self.assertEqual(len(SeatMap.for_showtime(self.showtime)), 48)
+
+        self.run_action('activate', ['E9', 'E10'])
+        self.assertEqual(len(SeatMap.for_showtime(self.showtime)), 50)
+
+    def test_other_processes_decode_the_cached_layout(self):
+        self.run_action('make_premium', ['B3'])
+        built = SeatLayout.for_theater(self.theater_id)
+        layout._decoded.clear()
+
+        with self.assertNumQueries(0):
+            loaded = SeatLayout.for_theater(self.theater_id)
+
+        self.assertIsNot(loaded, built)
+        for field in ('version', 'seat_ids', 'rows', 'numbers', 'seat_types'):
+            self.assertEqual(getattr(loaded, field), getattr(built, field))
+
+
+class ReleaseBookingsTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret')
+        self.seat_ids = list(Seat.objects.values_list('id', flat=True))
+        self.booking = reserve_seats(self.user, self.showtime, self.seat_ids[:3])
+
+    def assertAvailable(self, count):
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.available_seats, count)
+
+    def test_cancel_credits_seats_once(self):
+        self.assertTrue(self.booking.cancel_booking('Changed plans'))
+        # A double-submitted cancel finds the booking already cancelled
+        stale = Booking.objects.get(pk=self.booking.pk)
+        stale.status = 'PENDING'
+        self.assertFalse(stale.cancel_booking('Changed plans'))
+
+        self.assertEqual(stale.status, 'CANCELLED')
+        self.assertAvailable(50)
+
+    def test_cancel_after_expiry_keeps_expired_booking(self):
+        Booking.objects.filter(pk=self.booking.pk).update(payment_deadline=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(expire_all_holds(), (1, 3))
+
+        self.assertFalse(self.booking.cancel_booking('Changed plans'))
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'EXPIRED')
+        self.assertEqual(self.booking.cancellation_reason, EXPIRY_REASON)
+        self.assertAvailable(50)
+
+    def test_release_skips_inactive_bookings(self):
+        other = reserve_seats(self.user, self.showtime, self.seat_ids[3:5])
+        self.booking.cancel_booking()
+
+        released, seats = release_bookings([self.booking.pk, other.pk], 'CANCELLED', 'Showtime cancelled')
+
+        self.assertEqual((released, seats), ([other.pk], 2))
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.cancellation_reason, '')
+        self.assertAvailable(50)
+
+    def test_void_showtime_skips_bookings_cancelled_since(self):
+        reserve_seats(self.user, self.showtime, self.seat_ids[3:5])
+        self.booking.cancel_booking()
+
+        result = void_showtime(self.showtime)
+
+        self.assertEqual((result.cancelled, result.seats), (1, 2))
+        self.assertAvailable(50)
+
+    def test_cancel_seats_releases_only_own_seats(self):
+        other = reserve_seats(self.user, self.showtime, self.seat_ids[3:5])
+
+        with patch('bookings.live.publish_seat_changes') as publish:
+            released = self.booking.cancel_seats([self.seat_ids[0], self.seat_ids[3]])
+
+        self.assertEqual(released, 1)
+        publish.assert_called_once_with(self.showtime.id, released=[self.seat_ids[0]])
+        self.assertEqual(other.booking_seats.filter(is_booked=True).count(), 2)
+        self.assertAvailable(46)
+
+    def test_cancel_seats_of_cancelled_booking_is_a_no_op(self):
+        stale = Booking.objects.get(pk=self.booking.pk)
+        self.booking.cancel_booking()
+
+        self.assertEqual(stale.cancel_seats(self.seat_ids[:1]), 0)
+        self.assertAvailable(50)
+
+
+class MoveShowtimeTests(TestCase):
+    def setUp(self):
+        self.source = create_showtime()
+        self.target = Showtime.objects.create(
+            movie=self.source.movie,
+            theater=self.source.theater,
+            show_date=self.source.show_date,
+            show_time=time(22, 0),
+            price=self.source.price,
+            available_seats=self.source.available_seats
+        )
+        self.user = User.objects.create_user('customer', password='secret')
+        self.seat_ids = list(Seat.objects.order_by('id').values_list('id', flat=True))
+
+    def assertAvailable(self, showtime, count):
+        showtime.refresh_from_db()
+        self.assertEqual(showtime.available_seats, count)
+
+    def test_moves_bookings_and_cancels_those_whose_seats_are_taken(self):
+        moving = reserve_seats(self.user, self.source, self.seat_ids[:2])
+        clashing = reserve_seats(self.user, self.source, self.seat_ids[2:4])
+        reserve_seats(self.user, self.target, self.seat_ids[3:4])
+
+        result = move_showtime(self.source, self.target)
+
+        self.assertEqual((result.moved, result.cancelled), (1, 1))
+        moving.refresh_from_db()
+        clashing.refresh_from_db()
+        self.assertEqual((moving.showtime_id, moving.status), (self.target.id, 'PENDING'))
+        self.assertEqual(clashing.status, 'CANCELLED')
+        self.assertAvailable(self.source, 50)
+        self.assertAvailable(self.target, 47)
+
+    def test_seats_booked_after_the_ids_are_read_are_not_double_booked(self):
+        booking = reserve_seats(self.user, self.source, self.seat_ids[:2])
+        active_booking_ids = showtimes._active_booking_ids
+
+        def booked_meanwhile(showtime):
+            booking_ids = active_booking_ids(showtime)
+            reserve_seats(self.user, self.target, self.seat_ids[1:2])
+            return booking_ids
+
+        with patch('bookings.showtimes._active_booking_ids', booked_meanwhile):
+            result = move_showtime(self.source, self.target)
+
+        self.assertEqual((result.moved, result.cancelled), (0, 1))
+        booking.refresh_from_db()
+        self.assertEqual((booking.showtime_id, booking.status), (self.source.id, 'CANCELLED'))
+        self.assertAvailable(self.target, 49)
+
+    def test_conflict_rolls_back_the_chunk(self):
+        booking = reserve_seats(self.user, self.source, self.seat_ids[:2])
+
+        with patch('bookings.showtimes.restore_available_seats', side_effect=IntegrityError):
+            with self.assertRaisesMessage(SeatUnavailable, 'run the move again'):
+                move_showtime(self.source, self.target)
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.showtime_id, self.source.id)
+        self.assertEqual(BookingSeat.objects.filter(showtime=self.target).count(), 0)
+        self.source.refresh_from_db()
+        self.assertTrue(self.source.is_active)
+
+
+class ReconcileSeatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('customer', password='secret')
+        self.recent = create_showtime()
+        self.old = create_showtime()
+        seat_ids = list(Seat.objects.filter(theater=self.recent.theater).values_list('id', flat=True))
+        reserve_seats(self.user, self.recent, seat_ids[:2])
+        Showtime.objects.update(available_seats=F('available_seats') - 5)
+
+    def test_since_repairs_only_recently_booked_showtimes(self):
+        call_command('reconcile_seats', '--since', '60', stdout=StringIO())
+
+        self.recent.refresh_from_db()
+        self.old.refresh_from_db()
+        self.assertEqual(self.recent.available_seats, 48)
+        self.assertEqual(self.old.available_seats, 45)
+
+    def test_repairs_every_showtime(self):
+        call_command('reconcile_seats', stdout=StringIO())
+
+        self.old.refresh_from_db()
+        self.assertEqual(self.old.available_seats, 50)
+
+
+class AdmissionTests(TestCase):
+    config = {'RATE': 5, 'BURST': 3}
+
+    def setUp(self):
+        cache.clear()
+
+    def admitted(self, slots, now):
+        return sum(slot <= now for slot in slots)
+
+    def test_admits_burst_then_rate(self):
+        now = 1000.0
+        slots = [_take_slot(1, self.config, now) for _ in range(10)]
+
+        self.assertEqual(self.admitted(slots, now), 4)
+        self.assertEqual(self.admitted(slots, now + 1), 9)
+
+    def test_quiet_spell_banks_at_most_burst(self):
+        _take_slot(1, self.config, 1000.0)
+
+        later = 5000.0
+        slots = [_take_slot(1, self.config, later) for _ in range(20)]
+
+        # The arrival that notices the idle schedule, then a fresh burst
+        self.assertEqual(self.admitted(slots, later), 5)
+
+    def test_concurrent_arrivals_get_distinct_slots(self):
+        now = clock.time()
+        barrier = threading.Barrier(10)
+        slots = []
+
+        def worker():
+            barrier.wait()
+            taken = [_take_slot(1, self.config, now) for _ in range(20)]
+            slots.extend(taken)
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(slots)), 200)
+        self.assertEqual(self.admitted(slots, now), 4)
+
+    def test_deploy_check_requires_shared_cache(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                              'LOCATION': 'redis://127.0.0.1:6379/1'}}
+
+        with override_settings(CACHES=local):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['bookings.E001'])
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class BookSeatsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+        self.seat_ids = list(Seat.objects.values_list('id', flat=True))
+        self.client.force_login(User.objects.create_user('customer', password='secret'))
+
+    def book(self, seat_ids):
+        return self.client.post(
+            reverse('bookings:book_seats'),
+            json.dumps({'showtime_id': self.showtime.id, 'seat_ids': seat_ids}),
+            content_type='application/json'
+        )
+
+    def test_booking_drops_cached_seat_map(self):
+        SeatMap.for_showtime(self.showtime)
+        self.assertIsNotNone(cache.get(CACHE_KEY % self.showtime.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.book(self.seat_ids[:2]).status_code, 200)
+
+        self.assertIsNone(cache.get(CACHE_KEY % self.showtime.id))
+        self.assertFalse(SeatMap.for_showtime(self.showtime).are_available(self.seat_ids[:2]))
+
+
+class CheckInTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret')
+        seat_ids = list(Seat.objects.values_list('id', flat=True))
+        self.booking = reserve_seats(self.user, self.showtime, seat_ids[:2])
+        Booking.objects.filter(id=self.booking.id).update(status='CONFIRMED')
+        self.token = sign_ticket(self.booking.id, self.showtime.id, 'A1, A2')
+
+    def test_second_scan_is_refused(self):
+        gate = CheckIn()
+
+        self.assertEqual(gate.admit(self.token, self.showtime.id), (True, self.booking.id, 'A1, A2'))
+        self.assertEqual(gate.admit(self.token, self.showtime.id), (False, self.booking.id, 'A1, A2'))
+
+        self.assertEqual(gate.flush(), 1)
+        self.booking.refresh_from_db()
+        self.assertIsNotNone(self.booking.checked_in_at)
+
+    def test_scan_at_another_gate_is_refused_once_flushed(self):
+        first = CheckIn()
+        first.admit(self.token, self.showtime.id)
+        first.flush()
+
+        self.assertFalse(CheckIn().admit(self.token, self.showtime.id)[0])
+
+    def test_flush_keeps_the_first_admission_time(self):
+        first, second = CheckIn(), CheckIn()
+        first.admit(self.token, self.showtime.id)
+        second.admit(self.token, self.showtime.id)
+        first.flush()
+        self.booking.refresh_from_db()
+        admitted_at = self.booking.checked_in_at
+
+        second.flush()
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.checked_in_at, admitted_at)
+
+    def test_rejects_cancelled_forged_and_misdirected_tickets(self):
+        other = reserve_seats(self.user, self.showtime, list(Seat.objects.values_list('id', flat=True))[2:3])
+        other.cancel_booking()
+        gate = CheckIn()
+
+        for token, showtime_id in [
+            (sign_ticket(other.id, self.showtime.id, 'A3'), self.showtime.id),
+            (self.token.replace('A1', 'A9'), self.showtime.id),
+            (self.token, self.showtime.id + 1),
+        ]:
+            with self.subTest(token=token, showtime_id=showtime_id):
+                with self.assertRaises(InvalidTicket):
+                    gate.admit(token, showtime_id)
+        self.assertEqual(gate.flush(), 0)
+
+
+@override_settings(TICKET_CACHE_DIR=tempfile.mkdtemp())
+@patch('bookings.tickets.render_ticket_pdf', return_value=b'%PDF-1.4 ticket')
+class TicketExportTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret')
+        self.staff = User.objects.create_user('staff', password='secret', is_staff=True)
+        seat_ids = list(Seat.objects.values_list('id', flat=True))
+        self.bookings = [reserve_seats(self.user, self.showtime, seat_ids[i:i + 2]) for i in (0, 2, 4)]
+        Booking.objects.filter(id__in=[booking.id for booking in self.bookings[:2]]).update(status='CONFIRMED')
+
+    def export(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('bookings:ticket_export'), params)
+        if response.status_code != 200:
+            return response, None
+        return response, zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+    def test_staff_exports_confirmed_tickets_of_a_showtime(self, render):
+        response, archive = self.export(self.staff, showtime=self.showtime.id)
+
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(
+            sorted(archive.namelist()),
+            sorted(f'ticket_{booking.booking_id}.pdf' for booking in self.bookings[:2])
+        )
+        self.assertEqual(archive.read(archive.namelist()[0]), b'%PDF-1.4 ticket')
+
+    def test_rendered_tickets_are_reused(self, render):
+        self.export(self.staff, showtime=self.showtime.id)
+        self.export(self.staff, showtime=self.showtime.id)
+
+        self.assertEqual(render.call_count, 2)
+
+    def test_customer_exports_only_own_bookings(self, render):
+        other = User.objects.create_user('other', password='secret')
+        booking_ids = [booking.booking_id for booking in self.bookings]
+
+        response, archive = self.export(self.user, booking=booking_ids)
+        self.assertEqual(len(archive.namelist()), 2)
+        self.assertEqual(self.export(other, booking=booking_ids)[0].status_code, 404)
+        self.assertEqual(self.export(self.user, showtime=self.showtime.id)[0].status_code, 403)
+        self.assertEqual(self.export(self.user, booking='not-a-uuid')[0].status_code, 400)
+
+
+@override_settings(TICKET_CACHE_DIR=tempfile.mkdtemp())
+@patch('bookings.tickets.render_ticket_pdf', return_value=b'%PDF-1.4 ticket')
+class TicketCacheTests(TestCase):
+    fields = {'booking_id': '0b5c4b1e-2f47-4d1b-9b2e-6f6f1c1f9a10', 'seats': 'A1'}
+
+    def test_superseded_ticket_stays_readable_once_open(self, render):
+        with open_cached_ticket(self.fields) as ticket:
+            store_ticket(cache_dir(self.fields['booking_id']), self.fields, 'newer')
+            discard_cached_tickets(self.fields['booking_id'])
+
+            self.assertEqual(ticket.read(), b'%PDF-1.4 ticket')
+
+    def test_ticket_deleted_before_opening_is_rendered_again(self, render):
+        def store_then_discard(directory, fields, digest):
+            path = store_ticket(directory, fields, digest)
+            discard_cached_tickets(fields['booking_id'])
+            return path
+
+        with patch('bookings.tickets.store_ticket', side_effect=store_then_discard):
+            with open_cached_ticket(self.fields) as ticket:
+                self.assertEqual(ticket.read(), b'%PDF-1.4 ticket')
+        self.assertEqual(render.call_count, 2)
+
+
+@override_settings(TICKET_CACHE_DIR=tempfile.mkdtemp())
+@patch('bookings.tickets.render_ticket_pdf', return_value=b'%PDF-1.4 ticket')
+class TicketPDFViewTests(TestCase):
+    def setUp(self):
+        showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret')
+        self.seat_ids = list(Seat.objects.values_list('id', flat=True)[:2])
+        self.booking = reserve_seats(self.user, showtime, self.seat_ids)
+        Booking.objects.filter(id=self.booking.id).update(status='CONFIRMED')
+        self.client.force_login(self.user)
+
+    def download(self, **headers):
+        return self.client.get(reverse('bookings:ticket_pdf', args=[self.booking.booking_id]), **headers)
+
+    def test_repeat_download_is_not_modified(self, render):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 ticket')
+
+        repeat = self.download(HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat['ETag'], response['ETag'])
+        self.assertEqual(render.call_count, 1)
+
+    def test_changed_ticket_gets_new_etag(self, render):
+        etag = self.download()['ETag']
+
+        self.booking.cancel_seats(self.seat_ids[:1])
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(render.call_count, 2)
+
+    def test_cancelled_ticket_is_not_served_from_etag(self, render):
+        etag = self.download()['ETag']
+
+        self.booking.cancel_booking()
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertRedirects(response, reverse('accounts:user_bookings'), fetch_redirect_response=False)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(TICKET_CACHE_DIR=tempfile.mkdtemp())
+@patch('bookings.tickets.render_ticket_pdf', return_value=b'%PDF-1.4 ticket')
+class TicketQueueTests(TestCase):
+    def setUp(self):
+        showtime = create_showtime()
+        user = User.objects.create_user('customer', password='secret')
+        self.booking = reserve_seats(user, showtime, list(Seat.objects.values_list('id', flat=True)[:2]))
+        Booking.objects.filter(id=self.booking.id).update(status='CONFIRMED')
+        self.booking.refresh_from_db()
+
+        # Render in threads so the patched renderer is the one that runs
+        self.pool = ThreadPoolExecutor(max_workers=2)
+        patcher = patch('bookings.ticket_queue.get_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.pool.shutdown)
+
+    def enqueue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_tickets(self.booking.id)
+        # Let submitted renders and their done callbacks finish
+        self.pool.shutdown(wait=True)
+
+    def test_rendered_ticket_is_stored_and_dequeued(self, render):
+        self.enqueue()
+
+        fields = ticket_fields(Booking.objects.select_related(
+            'showtime__movie', 'showtime__theater', 'user'
+        ).get(id=self.booking.id))
+        path = cache_dir(self.booking.booking_id) / f'{ticket_hash(fields)}.pdf'
+        self.assertEqual(path.read_bytes(), b'%PDF-1.4 ticket')
+        self.assertEqual(queued_tickets(), [])
+
+    def test_failed_render_keeps_marker_for_retry(self, render):
+        render.side_effect = RuntimeError('renderer crashed')
+        self.enqueue()
+
+        self.assertEqual(queued_tickets(), [self.booking.id])
+
+        render.side_effect = None
+        self.pool = ThreadPoolExecutor(max_workers=2)
+        with patch('bookings.ticket_queue.get_pool', return_value=self.pool):
+            self.assertEqual(render_tickets(queued_tickets()), 1)
+        self.assertEqual(queued_tickets(), [])
+
+    def test_unconfirmed_booking_is_dequeued_without_rendering(self, render):
+        Booking.objects.filter(id=self.booking.id).update(status='CANCELLED')
+        self.enqueue()
+
+        render.assert_not_called()
+        self.assertEqual(queued_tickets(), [])
+
+
+class SeatEventsTests(TestCase):
+    """Seat events as the ASGI application streams them to live clients."""
+
+    class RolledBack(Exception):
+        pass
+
+    def publish(self, showtime_id, commit, **seats):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    publish_seat_changes(showtime_id, **seats)
+                    if not commit:
+                        raise self.RolledBack
+            except self.RolledBack:
+                pass
+        return len(callbacks)
+
+    async def connect(self, scope):
+        communicator = ApplicationCommunicator(application, scope)
+        await communicator.send_input({'type': 'websocket.connect' if scope['type'] == 'websocket' else 'http.request'})
+        opened = await communicator.receive_output(1)
+        # Give the app its turn to subscribe before anything is published
+        self.assertTrue(await communicator.receive_nothing(0.05))
+        return communicator, opened
+
+    async def test_sse_client_receives_committed_changes_only(self):
+        communicator, start = await self.connect(
+            {'type': 'http', 'method': 'GET', 'path': '/live/showtimes/7/', 'headers': []}
+        )
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+
+        self.assertEqual(await sync_to_async(self.publish)(7, False, booked=[1]), 0)
+        self.assertEqual(await sync_to_async(self.publish)(8, True, booked=[2]), 1)
+        self.assertTrue(await communicator.receive_nothing(0.1))
+
+        await sync_to_async(self.publish)(7, True, booked=[3], released=[4])
+        event = await communicator.receive_output(1)
+        self.assertTrue(event['more_body'])
+        self.assertTrue(event['body'].startswith(b'data: '))
+        self.assertEqual(json.loads(event['body'][6:]),
+                         {'type': 'seats', 'showtime': 7, 'booked': [3], 'released': [4]})
+
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(1)
+        self.assertNotIn(7, hub.subscribers)
+
+    async def test_websocket_client_receives_committed_changes(self):
+        communicator, accept = await self.connect({'type': 'websocket', 'path': '/live/showtimes/7/', 'headers': []})
+        self.assertEqual(accept['type'], 'websocket.accept')
+
+        await sync_to_async(self.publish)(7, True, released=[5])
+        frame = await communicator.receive_output(1)
+        self.assertEqual(json.loads(frame['text'])['released'], [5])
+
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(1)
+
+    async def test_unknown_path_is_not_found(self):
+        communicator = ApplicationCommunicator(
+            application, {'type': 'http', 'method': 'GET', 'path': '/live/nowhere/', 'headers': []}
+        )
+        await communicator.send_input({'type': 'http.request'})
+        self.assertEqual((await communicator.receive_output(1))['status'], 404)
+
+
+class CheckInFlushTests(TransactionTestCase):
+    @patch('bookings.checkin.FLUSH_INTERVAL', 0.05)
+    def test_other_gate_rejects_ticket_once_interval_passed(self):
+        showtime = create_showtime()
+        user = User.objects.create_user('customer', password='secret')
+        booking = reserve_seats(user, showtime, list(Seat.objects.values_list('id', flat=True)[:1]))
+        Booking.objects.filter(id=booking.id).update(status='CONFIRMED')
+        token = sign_ticket(booking.id, showtime.id, 'A1')
+
+        first = CheckIn()
+        first.admit(token, showtime.id)
+        timer = first.timer
+        # No further scans at the first gate; its timer writes the admission
+        timer.join(5)
+
+        self.assertFalse(timer.is_alive())
+        self.assertEqual(first.pending, [])
+        self.assertFalse(CheckIn().admit(token, showtime.id)[0])
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    requests = 300
+
+    def test_overlapping_requests_never_oversell(self):
+        showtime = create_showtime()
+        seat_ids = list(Seat.objects.values_list('id', flat=True))
+        users = [User.objects.create_user(f'customer{i}', password='secret') for i in range(10)]
+        rng = random.Random(1234)
+        attempts = [
+            (users[i % len(users)], rng.sample(seat_ids, rng.randint(1, 4)))
+            for i in range(self.requests)
+        ]
+        barrier = threading.Barrier(20)
+        lock = threading.Lock()
+        succeeded = []
+
+        def worker(chunk):
+            try:
+                barrier.wait()
+                for user, requested in chunk:
+                    for _ in range(100):
+                        try:
+                            reserve_seats(user, showtime, requested)
+                        except SeatUnavailable:
+                            break
+                        except OperationalError:
+                            # SQLite's shared-cache test database reports lock contention immediately
+                            clock.sleep(0.001)
+                            continue
+                        with lock:
+                            succeeded.append(requested)
+                        break
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(attempts[i::20],)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        claimed = [seat_id for requested in succeeded for seat_id in requested]
+        self.assertTrue(succeeded)
+        self.assertEqual(len(claimed), len(set(claimed)))
+        self.assertEqual(BookingSeat.objects.filter(is_booked=True).count(), len(claimed))
+        self.assertEqual(Booking.objects.count(), len(succeeded))
+
+        showtime.refresh_from_db()
+        self.assertEqual(showtime.available_seats, len(seat_ids) - len(claimed))
+
+
+class BookingQueryPlanTests(QueryPlanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret', is_staff=True)
+        seat_ids = list(Seat.objects.values_list('id', flat=True))
+        self.booking = reserve_seats(self.user, self.showtime, seat_ids[:2])
+
+    def test_best_seats(self):
+        response = self.assertViewIndexed(
+            BestSeatsView, '/?count=2', self.user, showtime_id=self.showtime.id
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_booking_confirmation(self):
+        self.assertViewIndexed(BookingConfirmationView, user=self.user, booking_id=self.booking.booking_id)
+
+    def test_showtime_ticket_export(self):
+        Booking.objects.filter(id=self.booking.id).update(status='CONFIRMED')
+        self.assertViewIndexed(TicketExportView, f'/?showtime={self.showtime.id}', self.user)
+
+    def test_expired_holds(self):
+        self.assertIndexed(*pending_holds().query.sql_with_params())
+
+    def test_reconcile_recent_showtimes(self):
+        with CaptureQueriesContext(connection) as queries:
+            call_command('reconcile_seats', '--since', '60', '--dry-run', stdout=StringIO())
+
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 2)
+        for sql in selects:
+            self.assertIndexed(sql)
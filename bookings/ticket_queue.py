@@ -0,0 +1,102 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from pathlib import Path
+import django
+from django.conf import settings
+from django.db import transaction
+from .models import Booking
+from .tickets import cache_dir, store_ticket, ticket_fields, ticket_hash
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking a threaded server copies its locks and open database
+            # connections, so workers start from a fresh interpreter
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'TICKET_RENDER_WORKERS', None),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            )
+    return _pool
+
+
+def queue_dir():
+    return Path(settings.TICKET_CACHE_DIR) / 'queue'
+
+
+def enqueue_tickets(*booking_ids):
+    """
+    Queue the tickets of confirmed bookings for background rendering.
+
+    A marker file per booking is written right away and removed once its
+    ticket is stored, so renders lost to a restart are picked up again by
+    ``render_tickets``. Rendering starts when the transaction commits.
+    """
+    directory = queue_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    for booking_id in booking_ids:
+        (directory / str(booking_id)).touch()
+    transaction.on_commit(lambda: submit_tickets(booking_ids))
+
+
+def queued_tickets():
+    directory = queue_dir()
+    if not directory.is_dir():
+        return []
+    return sorted(int(path.name) for path in directory.iterdir() if path.name.isdigit())
+
+
+def submit_tickets(booking_ids):
+    """Hand the tickets of ``booking_ids`` to the render pool; returns the futures."""
+    bookings = Booking.objects.filter(
+        id__in=booking_ids
+    ).select_related('showtime__movie', 'showtime__theater', 'user')
+    found = set()
+    futures = []
+
+    for booking in bookings:
+        found.add(booking.id)
+        if booking.status != 'CONFIRMED':
+            _dequeue(booking.id)
+            continue
+        # Workers only get plain strings; the database stays in this process
+        fields = ticket_fields(booking)
+        future = get_pool().submit(
+            store_ticket, str(cache_dir(fields['booking_id'])), fields, ticket_hash(fields)
+        )
+        future.booking_id = booking.id
+        future.add_done_callback(_finish)
+        futures.append(future)
+
+    for booking_id in set(booking_ids) - found:
+        _dequeue(booking_id)
+    return futures
+
+
+def render_tickets(booking_ids):
+    """Render the tickets of ``booking_ids`` and wait for them; returns the count."""
+    futures = submit_tickets(booking_ids)
+    wait(futures)
+    rendered = 0
+    for future in futures:
+        if future.exception() is None:
+            # Done callbacks may still be pending after wait() returns
+            _dequeue(future.booking_id)
+            rendered += 1
+    return rendered
+
+
+def _finish(future):
+    # A failed render keeps its marker for the next render_tickets run
+    if future.exception() is None:
+        _dequeue(future.booking_id)
+
+
+def _dequeue(booking_id):
+    (queue_dir() / str(booking_id)).unlink(missing_ok=True)
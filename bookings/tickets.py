@@ -0,0 +1,301 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+from pathlib import Path
+from django.conf import settings
+from .checkin import sign_ticket
+from .models import BookingSeat
+
+
+def ticket_fields(booking):
+    """
+    Everything printed on a booking's ticket, as plain strings.
+
+    Expects ``booking`` to come with its showtime, movie, theater and user
+    already selected; the seats cost one query.
+    """
+    showtime = booking.showtime
+    seats = BookingSeat.objects.filter(
+        booking_id=booking.id,
+        is_booked=True
+    ).order_by('seat__row', 'seat__number').values_list('seat__row', 'seat__number')
+    seat_labels = ', '.join(f'{row}{number}' for row, number in seats)
+
+    return {
+        'booking_id': str(booking.booking_id),
+        'movie': showtime.movie.title,
+        'theater': showtime.theater.name,
+        'location': showtime.theater.location,
+        'date': showtime.show_date.strftime('%A, %B %d, %Y'),
+        'time': showtime.show_time.strftime('%I:%M %p'),
+        'seats': seat_labels,
+        'customer': booking.user.get_full_name() or booking.user.username,
+        'total_amount': f'${booking.total_amount}',
+        'qr': sign_ticket(booking.id, showtime.id, seat_labels.replace(' ', '')),
+    }
+
+
+def ticket_hash(fields):
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:32]
+
+
+NOTES = [
+    "• Arrive 15 minutes before showtime",
+    "• Carry valid photo ID for verification",
+    "• No outside food and beverages allowed",
+    "• Mobile phones on silent mode",
+    "• This ticket is non-transferable"
+]
+
+
+class TicketTemplate:
+    """
+    The parts of a ticket that never change, drawn once per process.
+
+    The static drawing is captured as a PDF content stream and installed
+    into each document as a form XObject, so every page only draws the
+    booking-specific text on top of it.
+    """
+
+    FORM_NAME = 'TicketStatic'
+    # Registered in this order in every document so the captured stream's
+    # font references (/F1, /F2) resolve to the same fonts
+    FONTS = ['Helvetica', 'Helvetica-Bold']
+
+    def __init__(self):
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import letter
+        from io import BytesIO
+
+        self.pagesize = letter
+        width, height = letter
+        p = canvas.Canvas(BytesIO(), pagesize=letter)
+        self._prime_fonts(p)
+
+        # Title
+        title = p.beginText(50, height - 50)
+        title.setFont("Helvetica-Bold", 24)
+        title.textOut("CINEMA E-TICKET")
+
+        # QR code caption
+        qr_label = p.beginText(55, height - 470)
+        qr_label.setFont("Helvetica", 12)
+        qr_label.textOut("SCAN AT ENTRY")
+
+        # Important notes
+        notes = p.beginText(200, height - 380)
+        notes.setFont("Helvetica-Bold", 10, leading=20)
+        notes.textLine("IMPORTANT INFORMATION:")
+        notes.setFont("Helvetica", 9, leading=15)
+        for note in NOTES:
+            notes.textLine(note)
+
+        # Footer
+        footer = p.beginText(50, 50)
+        footer.setFont("Helvetica", 8, leading=15)
+        footer.textLine("Customer Support: +1 (555) 123-4567 | support@cinemabooking.com")
+        footer.textLine("Thank you for choosing Cinema Booking System!")
+
+        self.code = '\n'.join([
+            title.getCode(),
+            qr_label.getCode(),
+            notes.getCode(),
+            footer.getCode(),
+        ])
+
+    def _prime_fonts(self, p):
+        for font in self.FONTS:
+            p.setFont(font, 12)
+
+    def new_canvas(self, buffer):
+        from reportlab.pdfgen import canvas
+
+        p = canvas.Canvas(buffer, pagesize=self.pagesize)
+        self._prime_fonts(p)
+        p.beginForm(self.FORM_NAME)
+        p.addLiteral(self.code)
+        p.endForm()
+        return p
+
+    def draw_page(self, p, fields):
+        width, height = self.pagesize
+        p.doForm(self.FORM_NAME)
+
+        # Movie title
+        p.setFont("Helvetica-Bold", 18)
+        p.drawString(50, height - 100, f"Movie: {fields['movie']}")
+
+        # Theater and show details
+        details = p.beginText(50, height - 130)
+        details.setFont("Helvetica", 12, leading=20)
+        details.textLine(f"Theater: {fields['theater']}")
+        details.textLine(f"Location: {fields['location']}")
+        details.moveCursor(0, 10)
+        details.textLine(f"Date: {fields['date']}")
+        details.textLine(f"Time: {fields['time']}")
+        details.moveCursor(0, 10)
+        details.textLine(f"Seats: {fields['seats']}")
+        details.moveCursor(0, 10)
+        details.textLine(f"Booking ID: {fields['booking_id']}")
+        details.textLine(f"Customer: {fields['customer']}")
+        details.textLine(f"Total Amount: {fields['total_amount']}")
+        p.drawText(details)
+
+        self.draw_qr(p, fields['qr'], 50, height - 450, 100)
+        p.setFont("Helvetica", 12)
+        p.drawString(55, height - 485, fields['booking_id'][:8])
+        p.showPage()
+
+    def draw_qr(self, p, value, x, y, size):
+        from reportlab.graphics.barcode.qrencoder import QRCode, QRErrorCorrectLevel
+
+        qr = QRCode(None, QRErrorCorrectLevel.M)
+        qr.addData(value)
+        qr.make()
+        count = qr.getModuleCount()
+
+        # One rectangle per run of dark modules, on a grid of one unit per module
+        runs = []
+        for row in range(count):
+            start = None
+            for column in range(count + 1):
+                dark = column < count and qr.isDark(row, column)
+                if dark and start is None:
+                    start = column
+                elif not dark and start is not None:
+                    runs.append(f'{start} {row} {column - start} 1 re')
+                    start = None
+
+        p.saveState()
+        p.translate(x, y + size)
+        p.scale(size / count, -size / count)
+        p.addLiteral('\n'.join(runs) + '\nf')
+        p.restoreState()
+
+_template = None
+
+
+def get_template():
+    global _template
+    if _template is None:
+        _template = TicketTemplate()
+    return _template
+
+
+def render_ticket_pdf(fields):
+    return render_tickets_pdf([fields])
+
+
+def render_tickets_pdf(fields_list):
+    """Render one page per ticket into a single PDF."""
+    from io import BytesIO
+
+    template = get_template()
+    buffer = BytesIO()
+    p = template.new_canvas(buffer)
+    for fields in fields_list:
+        template.draw_page(p, fields)
+    p.save()
+    return buffer.getvalue()
+
+
+def cache_dir(booking_id):
+    return Path(settings.TICKET_CACHE_DIR) / str(booking_id)
+
+
+def open_cached_ticket(fields, digest=None):
+    """
+    Open the rendered ticket for ``fields``, rendering it first if this
+    exact content has not been cached yet.
+
+    A newer render or a cancellation may delete the file between finding
+    and opening it; the ticket is then rendered into memory instead. Once
+    open, the file stays readable however it is superseded.
+    """
+    digest = digest or ticket_hash(fields)
+    path = store_ticket(cache_dir(fields['booking_id']), fields, digest)
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        return BytesIO(render_ticket_pdf(fields))
+
+
+def store_ticket(directory, fields, digest):
+    directory = Path(directory)
+    path = directory / f'{digest}.pdf'
+    if path.exists():
+        return path
+
+    directory.mkdir(parents=True, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'wb') as temp_file:
+        temp_file.write(render_ticket_pdf(fields))
+    os.replace(temp_path, path)
+
+    # Older renders of this booking are stale now
+    for stale in directory.iterdir():
+        if stale != path and stale.suffix == '.pdf':
+            stale.unlink(missing_ok=True)
+    return path
+
+
+def discard_cached_tickets(booking_id):
+    directory = cache_dir(booking_id)
+    if not directory.is_dir():
+        return
+    for path in directory.iterdir():
+        path.unlink(missing_ok=True)
+    try:
+        directory.rmdir()
+    except OSError:
+        # A concurrent download re-rendered the ticket meanwhile
+        pass
+
+
+class _ZipStream:
+    """Write-only, unseekable sink that hands back what was written so far."""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_tickets_zip(bookings):
+    """
+    Yield a ZIP archive of the tickets of ``bookings`` chunk by chunk.
+
+    ``bookings`` should select their showtime, movie, theater and user.
+    Tickets come from the rendered ticket cache and are written one at a
+    time, so memory stays bounded by a single ticket however many
+    bookings are exported.
+    """
+    stream = _ZipStream()
+    # PDFs are compressed already; storing them keeps the export cheap
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+        for booking in bookings:
+            fields = ticket_fields(booking)
+            with open_cached_ticket(fields) as ticket, \
+                    archive.open(f"ticket_{fields['booking_id']}.pdf", 'w') as entry:
+                shutil.copyfileobj(ticket, entry)
+            yield stream.drain()
+    yield stream.drain()
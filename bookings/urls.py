@@ -5,9 +5,13 @@ app_name = 'bookings'
 
 urlpatterns = [
     path('seat-selection/<int:showtime_id>/', views.SeatSelectionView.as_view(), name='seat_selection'),
+    path('waiting-room/<int:showtime_id>/', views.WaitingRoomView.as_view(), name='waiting_room'),
+    path('best-seats/<int:showtime_id>/', views.BestSeatsView.as_view(), name='best_seats'),
     path('book-seats/', views.BookSeatsView.as_view(), name='book_seats'),
     path('booking-confirmation/<uuid:booking_id>/', views.BookingConfirmationView.as_view(), name='booking_confirmation'),
     path('cancel-booking/<uuid:booking_id>/', views.CancelBookingView.as_view(), name='cancel_booking'),
     path('ticket/<uuid:booking_id>/', views.TicketView.as_view(), name='ticket'),
     path('ticket-pdf/<uuid:booking_id>/', views.TicketPDFView.as_view(), name='ticket_pdf'),
+    path('ticket-export/', views.TicketExportView.as_view(), name='ticket_export'),
+    path('check-in/<int:showtime_id>/', views.CheckInView.as_view(), name='check_in'),
 ]
@@ -1,35 +1,47 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import get_object_or_404, redirect
 from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.db import transaction
-from django.utils import timezone
+from django.core.exceptions import ValidationError
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from movies.models import Showtime
-from .models import Seat, Booking, BookingSeat
+from .admission import WriteGateBusy, get_ticket, write_gate
+from .allocation import best_available
+from .checkin import InvalidTicket, check_in
+from .models import Booking
+from .reservations import SeatUnavailable, reserve_seats
+from .seatmap import SeatMap
+from .tickets import iter_tickets_zip, open_cached_ticket, ticket_fields, ticket_hash
 import json
 
 
+def waiting_response(ticket):
+    response = JsonResponse({'error': 'Waiting for admission', **ticket.as_dict()}, status=429)
+    response['Retry-After'] = str(ticket.eta)
+    return response
+
+
 class SeatSelectionView(LoginRequiredMixin, TemplateView):
     template_name = 'bookings/seat_selection.html'
 
+    def get(self, request, *args, **kwargs):
+        ticket = get_ticket(request, kwargs['showtime_id'])
+        if not ticket.admitted:
+            return waiting_response(ticket)
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         showtime_id = kwargs['showtime_id']
         showtime = get_object_or_404(Showtime, id=showtime_id)
 
-        # Get all seats for this theater
-        seats = Seat.objects.filter(theater=showtime.theater).order_by('row', 'number')
-
-        # Get booked seats for this showtime
-        booked_seats = BookingSeat.objects.filter(
-            showtime=showtime,
-            is_booked=True
-        ).values_list('seat_id', flat=True)
+        seat_map = SeatMap.for_showtime(showtime)
+        seats = list(seat_map.seats())
 
         context['showtime'] = showtime
         context['seats'] = seats
-        context['booked_seats'] = list(booked_seats)
+        context['booked_seats'] = [seat.id for seat in seats if seat.is_booked]
         return context
 
 
@@ -39,47 +51,38 @@ class BookSeatsView(LoginRequiredMixin, View):
             data = json.loads(request.body)
             showtime_id = data.get('showtime_id')
             seat_ids = data.get('seat_ids', [])
+            seat_count = int(data.get('count') or 0)
 
-            if not seat_ids:
+            if not seat_ids and not seat_count:
                 return JsonResponse({'error': 'No seats selected'}, status=400)
 
+            ticket = get_ticket(request, showtime_id)
+            if not ticket.admitted:
+                return waiting_response(ticket)
+
             showtime = get_object_or_404(Showtime, id=showtime_id)
-            seats = Seat.objects.filter(id__in=seat_ids)
+            seat_map = SeatMap.for_showtime(showtime)
 
-            # Check if seats are available
-            booked_seats = BookingSeat.objects.filter(
-                showtime=showtime,
-                seat__in=seats,
-                is_booked=True
-            )
+            # Pick the best seats together when only a count was given
+            if not seat_ids:
+                seat_ids = best_available(seat_map, seat_count, data.get('seat_type'))
+                if not seat_ids:
+                    return JsonResponse({'error': 'Not enough adjacent seats available'}, status=400)
+            seat_ids = {int(seat_id) for seat_id in seat_ids}
 
-            if booked_seats.exists():
+            # Check if seats are available
+            if not seat_map.are_available(seat_ids):
                 return JsonResponse({'error': 'Some seats are already booked'}, status=400)
 
-            # Calculate total amount
-            total_amount = showtime.price * len(seats)
-
-            # Create booking
-            with transaction.atomic():
-                booking = Booking.objects.create(
-                    user=request.user,
-                    showtime=showtime,
-                    total_amount=total_amount,
-                    status='PENDING'
-                )
-
-                # Create booking seats
-                for seat in seats:
-                    BookingSeat.objects.create(
-                        booking=booking,
-                        seat=seat,
-                        showtime=showtime,
-                        is_booked=True
-                    )
-
-                # Update available seats
-                showtime.available_seats -= len(seats)
-                showtime.save()
+            try:
+                with write_gate:
+                    booking = reserve_seats(request.user, showtime, seat_ids)
+            except SeatUnavailable as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            except WriteGateBusy:
+                response = JsonResponse({'error': 'Booking is busy, please retry'}, status=503)
+                response['Retry-After'] = '1'
+                return response
 
             return JsonResponse({
                 'success': True,
@@ -91,6 +94,32 @@ class BookSeatsView(LoginRequiredMixin, View):
             return JsonResponse({'error': str(e)}, status=500)
 
 
+class WaitingRoomView(LoginRequiredMixin, View):
+    def get(self, request, showtime_id):
+        return JsonResponse(get_ticket(request, showtime_id).as_dict())
+
+
+class BestSeatsView(LoginRequiredMixin, View):
+    def get(self, request, showtime_id):
+        showtime = get_object_or_404(Showtime, id=showtime_id)
+        try:
+            seat_count = int(request.GET.get('count', 1))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid seat count'}, status=400)
+
+        seat_map = SeatMap.for_showtime(showtime)
+        seat_ids = best_available(seat_map, seat_count, request.GET.get('seat_type') or None)
+        if not seat_ids:
+            return JsonResponse({'error': 'Not enough adjacent seats available'}, status=404)
+
+        positions = [seat_map.position(seat_id) for seat_id in seat_ids]
+        return JsonResponse({
+            'seat_ids': seat_ids,
+            'seats': [f'{seat_map.rows[position]}{seat_map.numbers[position]}' for position in positions],
+            'total_amount': str(showtime.price * len(seat_ids)),
+        })
+
+
 class BookingConfirmationView(LoginRequiredMixin, TemplateView):
     template_name = 'bookings/booking_confirmation.html'
 
@@ -106,8 +135,12 @@ class CancelBookingView(LoginRequiredMixin, View):
     def post(self, request, booking_id):
         booking = get_object_or_404(Booking, booking_id=booking_id, user=request.user)
 
-        if booking.status in ['CONFIRMED', 'PENDING']:
-            booking.cancel_booking("Cancelled by user")
+        seat_ids = request.POST.getlist('seat_ids')
+
+        if booking.status in ['CONFIRMED', 'PENDING'] and seat_ids:
+            booking.cancel_seats([int(seat_id) for seat_id in seat_ids], "Cancelled by user")
+            messages.success(request, 'Selected seats cancelled successfully.')
+        elif booking.status in ['CONFIRMED', 'PENDING'] and booking.cancel_booking("Cancelled by user"):
             messages.success(request, 'Booking cancelled successfully.')
         else:
             messages.error(request, 'Cannot cancel this booking.')
@@ -133,80 +166,86 @@ class TicketView(LoginRequiredMixin, TemplateView):
 
 class TicketPDFView(LoginRequiredMixin, View):
     def get(self, request, booking_id):
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-        from io import BytesIO
-
-        booking = get_object_or_404(Booking, booking_id=booking_id, user=request.user)
+        booking = get_object_or_404(
+            Booking.objects.select_related('showtime__movie', 'showtime__theater', 'user'),
+            booking_id=booking_id,
+            user=request.user
+        )
 
         if booking.status != 'CONFIRMED':
             messages.error(request, 'Ticket not available for this booking.')
             return redirect('accounts:user_bookings')
 
-        # Create PDF
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-
-        # Title
-        p.setFont("Helvetica-Bold", 24)
-        p.drawString(50, height - 50, "CINEMA E-TICKET")
-
-        # Movie title
-        p.setFont("Helvetica-Bold", 18)
-        p.drawString(50, height - 100, f"Movie: {booking.showtime.movie.title}")
-
-        # Theater info
-        p.setFont("Helvetica", 12)
-        p.drawString(50, height - 130, f"Theater: {booking.showtime.theater.name}")
-        p.drawString(50, height - 150, f"Location: {booking.showtime.theater.location}")
-
-        # Show details
-        p.drawString(50, height - 180, f"Date: {booking.showtime.show_date.strftime('%A, %B %d, %Y')}")
-        p.drawString(50, height - 200, f"Time: {booking.showtime.show_time.strftime('%I:%M %p')}")
-
-        # Seats
-        seats = ", ".join([f"{bs.seat.row}{bs.seat.number}" for bs in booking.booking_seats.all()])
-        p.drawString(50, height - 230, f"Seats: {seats}")
-
-        # Booking details
-        p.drawString(50, height - 260, f"Booking ID: {booking.booking_id}")
-        p.drawString(50, height - 280, f"Customer: {booking.user.get_full_name() or booking.user.username}")
-        p.drawString(50, height - 300, f"Total Amount: ${booking.total_amount}")
-
-        # QR Code placeholder
-        p.rect(50, height - 450, 100, 100, stroke=1, fill=0)
-        p.drawString(55, height - 470, "QR CODE")
-        p.drawString(55, height - 485, str(booking.booking_id)[:8])
-
-        # Important notes
-        p.setFont("Helvetica-Bold", 10)
-        p.drawString(200, height - 380, "IMPORTANT INFORMATION:")
-        p.setFont("Helvetica", 9)
-        notes = [
-            "• Arrive 15 minutes before showtime",
-            "• Carry valid photo ID for verification",
-            "• No outside food and beverages allowed",
-            "• Mobile phones on silent mode",
-            "• This ticket is non-transferable"
-        ]
-
-        y_pos = height - 400
-        for note in notes:
-            p.drawString(200, y_pos, note)
-            y_pos -= 15
-
-        # Footer
-        p.setFont("Helvetica", 8)
-        p.drawString(50, 50, "Customer Support: +1 (555) 123-4567 | support@cinemabooking.com")
-        p.drawString(50, 35, "Thank you for choosing Cinema Booking System!")
-
-        p.showPage()
-        p.save()
-
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="ticket_{booking.booking_id}.pdf"'
+        fields = ticket_fields(booking)
+        etag = f'"{ticket_hash(fields)}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(
+                open_cached_ticket(fields, etag.strip('"')),
+                as_attachment=True,
+                filename=f'ticket_{booking.booking_id}.pdf',
+                content_type='application/pdf'
+            )
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class TicketExportView(LoginRequiredMixin, View):
+    """
+    Stream a ZIP of tickets for ``?booking=<id>&booking=...`` or, for
+    staff, every confirmed booking of ``?showtime=<id>``.
+    """
+
+    def get(self, request):
+        bookings = Booking.objects.filter(status='CONFIRMED')
+        showtime_id = request.GET.get('showtime')
+        booking_ids = request.GET.getlist('booking')
+
+        try:
+            if showtime_id:
+                if not request.user.is_staff:
+                    return JsonResponse({'error': 'Only staff can export a whole showtime'}, status=403)
+                bookings = bookings.filter(showtime_id=int(showtime_id))
+            elif booking_ids:
+                bookings = bookings.filter(booking_id__in=booking_ids)
+                if not request.user.is_staff:
+                    bookings = bookings.filter(user=request.user)
+            else:
+                return JsonResponse({'error': 'No bookings selected'}, status=400)
+        except (ValidationError, ValueError):
+            return JsonResponse({'error': 'Invalid booking or showtime id'}, status=400)
+
+        bookings = bookings.select_related(
+            'showtime__movie', 'showtime__theater', 'user'
+        ).order_by('id')
+        if not bookings.exists():
+            return JsonResponse({'error': 'No tickets available'}, status=404)
+
+        response = StreamingHttpResponse(
+            iter_tickets_zip(bookings.iterator(chunk_size=100)),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = 'attachment; filename="tickets.zip"'
+        patch_cache_control(response, private=True, no_store=True)
         return response
+
+
+class CheckInView(LoginRequiredMixin, View):
+    """Gate scanner endpoint: POST ``{"token": <QR contents>}``."""
+
+    def post(self, request, showtime_id):
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'Only staff can check tickets in'}, status=403)
+
+        try:
+            token = json.loads(request.body)['token']
+            admitted, booking_id, seats = check_in.admit(token, showtime_id)
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Missing ticket token'}, status=400)
+        except InvalidTicket as e:
+            return JsonResponse({'admitted': False, 'error': str(e)}, status=403)
+
+        if not admitted:
+            return JsonResponse({'admitted': False, 'error': 'Ticket already used', 'seats': seats}, status=409)
+        return JsonResponse({'admitted': True, 'booking': booking_id, 'seats': seats})
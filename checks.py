@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.checks import Error, Tags, register
+
+# Backends whose contents are private to one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Refuse to deploy with a default cache that workers do not share.
+
+    Each process rebuilds its autocomplete index when the catalogue version
+    in the default cache moves; with a per-process backend the other
+    workers never see the bump and keep suggesting stale movies.
+    """
+    backend = settings.CACHES.get(DEFAULT_CACHE_ALIAS, {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            'The default cache (%s) is not shared between worker processes.' % backend,
+            hint='Configure Redis or Memcached as the default cache in CACHES.',
+            id='movies.E001',
+        )]
+    return []
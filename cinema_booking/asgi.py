@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cinema_booking.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from bookings.live import seat_events_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] in ('http', 'websocket') and scope['path'].startswith('/live/'):
+        await seat_events_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -85,6 +85,27 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+# Seat maps and layouts, waiting room slots and listing versions are shared
+# by every worker through the default cache. The in-memory cache is private
+# to one process, so it only suits the development server.
+
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://127.0.0.1:6379/1',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -128,6 +149,12 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rendered ticket PDFs, kept outside MEDIA_ROOT so they are never served publicly
+TICKET_CACHE_DIR = BASE_DIR / 'ticket_cache'
+
+# Processes rendering tickets in the background (None: one per CPU)
+TICKET_RENDER_WORKERS = None
+
 # Login URLs
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -141,3 +168,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Stripe settings (test mode)
 STRIPE_PUBLISHABLE_KEY = 'pk_test_...'  # Add your test key
 STRIPE_SECRET_KEY = 'sk_test_...'  # Add your test key
+
+# Seat maps are cached per showtime for this many seconds
+SEAT_MAP_TTL = 5
+
+# Home and movie list pages are cached until a movie or showtime changes,
+# and at most this many seconds
+MOVIE_LISTING_TTL = 300
+
+# Live seat updates (served by cinema_booking.asgi under /live/).
+# Use 'bookings.live.BrokerBackend' with `manage.py seat_event_broker`
+# when running more than one worker.
+SEAT_EVENTS_BACKEND = 'bookings.live.InProcessBackend'
+SEAT_EVENTS_BROKER = ('127.0.0.1', 8765)
+
+# Admission control for hot showtimes, see bookings.admission.DEFAULTS
+WAITING_ROOM = {
+    'RATE': 5,
+    'BURST': 50,
+}
@@ -0,0 +1,5 @@
+"""
+Database helpers shared by the cinema site's ``movies`` app and the movies
+API app. They depend on nothing but Django, so the site imports them as
+``common`` and the API app as its own ``.common`` subpackage.
+"""
@@ -0,0 +1,176 @@
+import re
+from functools import reduce
+from operator import or_
+from django.db import connections, router
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+INTEGER_KEYS = ('AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField')
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index over text columns of a model.
+
+    Models with an integer primary key get an external-content FTS5 table
+    keyed on it. Any other key is stored in an unindexed column of the
+    index and joined on, since SQLite's implicit rowid may change on
+    VACUUM. Triggers keep the index in sync on every insert, delete and
+    update of an indexed column, however the row was written. Other
+    databases, or a database where the index has not been installed yet,
+    fall back to ``icontains`` lookups.
+    """
+
+    def __init__(self, model, weights, table=None):
+        # ``weights`` maps each indexed field to its bm25 weight
+        self.model = model
+        self.weights = weights
+        self._table = table
+        self._installed = {}
+
+    @property
+    def source(self):
+        return self.model._meta.db_table
+
+    @property
+    def table(self):
+        return self._table or f'{self.source}_fts'
+
+    @property
+    def columns(self):
+        return [self.model._meta.get_field(name).column for name in self.weights]
+
+    @property
+    def key(self):
+        return self.model._meta.pk.column
+
+    @property
+    def external_content(self):
+        return self.model._meta.pk.get_internal_type() in INTEGER_KEYS
+
+    def get_connection(self):
+        return connections[router.db_for_read(self.model)]
+
+    def is_installed(self, connection=None):
+        connection = connection or self.get_connection()
+        if connection.vendor != 'sqlite':
+            return False
+        if connection.alias not in self._installed:
+            self._installed[connection.alias] = self._table_exists(connection)
+        return self._installed[connection.alias]
+
+    def _table_exists(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.table])
+            return cursor.fetchone() is not None
+
+    def install_sql(self):
+        table, source, key = self.table, self.source, self.key
+        columns = ', '.join(self.columns)
+        new = ', '.join(f'new.{column}' for column in self.columns)
+        old = ', '.join(f'old.{column}' for column in self.columns)
+        tokenize = "tokenize='unicode61 remove_diacritics 2'"
+        if self.external_content:
+            return [
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                f"{columns}, content='{source}', content_rowid='{key}', {tokenize})",
+                f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {source} BEGIN "
+                f"INSERT INTO {table}(rowid, {columns}) VALUES (new.{key}, {new}); END",
+                f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {source} BEGIN "
+                f"INSERT INTO {table}({table}, rowid, {columns}) VALUES ('delete', old.{key}, {old}); END",
+                f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {columns} ON {source} BEGIN "
+                f"INSERT INTO {table}({table}, rowid, {columns}) VALUES ('delete', old.{key}, {old}); "
+                f"INSERT INTO {table}(rowid, {columns}) VALUES (new.{key}, {new}); END",
+            ]
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({key} UNINDEXED, {columns}, {tokenize})",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {table}({key}, {columns}) VALUES (new.{key}, {new}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {source} BEGIN "
+            f"DELETE FROM {table} WHERE {key} = old.{key}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {columns} ON {source} BEGIN "
+            f"DELETE FROM {table} WHERE {key} = old.{key}; "
+            f"INSERT INTO {table}({key}, {columns}) VALUES (new.{key}, {new}); END",
+        ]
+
+    def uninstall_sql(self):
+        return [
+            f'DROP TRIGGER IF EXISTS {self.table}_ai',
+            f'DROP TRIGGER IF EXISTS {self.table}_ad',
+            f'DROP TRIGGER IF EXISTS {self.table}_au',
+            f'DROP TABLE IF EXISTS {self.table}',
+        ]
+
+    def install(self, connection=None):
+        """Create the index and its triggers if missing, filling a new index."""
+        connection = connection or self.get_connection()
+        if connection.vendor != 'sqlite':
+            return
+        existed = self._table_exists(connection)
+        with connection.cursor() as cursor:
+            for statement in self.install_sql():
+                cursor.execute(statement)
+        if not existed:
+            self.rebuild(connection)
+        self._installed[connection.alias] = True
+
+    def uninstall(self, connection=None):
+        connection = connection or self.get_connection()
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            for statement in self.uninstall_sql():
+                cursor.execute(statement)
+        self._installed.pop(connection.alias, None)
+
+    def rebuild(self, connection=None):
+        """Re-read every row of the model into the index."""
+        connection = connection or self.get_connection()
+        table, key = self.table, self.key
+        columns = ', '.join(self.columns)
+        with connection.cursor() as cursor:
+            if self.external_content:
+                cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+            else:
+                cursor.execute(f'DELETE FROM {table}')
+                selected = ', '.join(f'"{column}"' for column in [key, *self.columns])
+                cursor.execute(f'INSERT INTO {table}({key}, {columns}) SELECT {selected} FROM "{self.source}"')
+        self._installed[connection.alias] = True
+
+    @staticmethod
+    def match_expression(query):
+        """Turn free text into an FTS5 query: every word, as a prefix."""
+        tokens = TOKEN_RE.findall(query)
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def search(self, queryset, query):
+        """
+        Filter ``queryset`` to rows matching ``query``.
+
+        Matches are annotated with ``search_rank`` (lower is better) and
+        ordered by it; callers may add tie-breakers with ``order_by``.
+        """
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+
+        if not self.is_installed():
+            return queryset.filter(
+                reduce(or_, (Q(**{f'{name}__icontains': query}) for name in self.weights))
+            ).annotate(search_rank=RawSQL('0', [], output_field=FloatField()))
+
+        # Join the index so FTS5 computes every match's rank in a single pass
+        weights = [float(weight) for weight in self.weights.values()]
+        if self.external_content:
+            join = f'{self.table}.rowid = "{self.source}".{self.key}'
+        else:
+            # The stored key is a column of the index too, weighted out of the rank
+            join = f'{self.table}.{self.key} = "{self.source}".{self.key}'
+            weights.insert(0, 0.0)
+        return queryset.extra(
+            select={'search_rank': f'bm25({self.table}, {", ".join(map(str, weights))})'},
+            tables=[self.table],
+            where=[join, f'{self.table} MATCH %s'],
+            params=[expression],
+        ).order_by('search_rank')
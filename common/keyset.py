@@ -0,0 +1,106 @@
+import base64
+import json
+from types import SimpleNamespace
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values, reverse=False):
+    data = json.dumps([reverse, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(reverse, values)`` from a cursor made by ``encode_cursor``."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        reverse, values = json.loads(data)
+    except (TypeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, list):
+        raise InvalidCursor('Invalid cursor')
+    return bool(reverse), values
+
+
+class Keyset:
+    """
+    Pages a queryset from the last row seen instead of by offset.
+
+    ``ordering`` must end in a unique field, e.g. ``('-release_date', '-id')``.
+    A page is one range query on the ordering's index that fetches one
+    extra row to tell whether another page follows, so no page needs
+    ``OFFSET`` or ``COUNT(*)``. Cursors hold the ordering's values of the
+    row a page continues from, and which way it goes.
+    """
+
+    def __init__(self, model, ordering):
+        self.ordering = list(ordering)
+        self.fields = [
+            (model._meta.get_field(name.lstrip('-')), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    def cursor_for(self, obj, reverse=False):
+        if isinstance(obj, dict):
+            # values() rows carry the same attributes as instances
+            obj = SimpleNamespace(**obj)
+        return encode_cursor([field.value_to_string(obj) for field, descending in self.fields], reverse)
+
+    def read_cursor(self, cursor):
+        """Return ``(reverse, values)`` from a cursor, with values of the fields' types."""
+        reverse, values = decode_cursor(cursor)
+        if len(values) != len(self.fields):
+            raise InvalidCursor('Invalid cursor')
+        try:
+            values = [field.to_python(value) for (field, descending), value in zip(self.fields, values)]
+        except (TypeError, ValidationError):
+            raise InvalidCursor('Invalid cursor')
+        return reverse, values
+
+    def beyond(self, values, reverse=False):
+        # (a, b) after (x, y) is a < x OR (a = x AND b < y) for descending
+        # columns; the extra bound on a lets the index narrow the range
+        condition = None
+        for (field, descending), value in reversed(list(zip(self.fields, values))):
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{f'{field.attname}__{lookup}': value})
+            if condition is not None:
+                step |= Q(**{field.attname: value}) & condition
+            condition = step
+
+        (first, descending), value = self.fields[0], values[0]
+        bound = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{first.attname}__{bound}': value}) & condition
+
+    def page(self, queryset, size, cursor=None):
+        """
+        Return ``(rows, next_cursor, previous_cursor)`` for the page of
+        ``queryset`` after ``cursor``, or the first page without one.
+        Raises ``InvalidCursor`` for a cursor this keyset did not make.
+        """
+        ordering = self.ordering
+        reverse = False
+        if cursor:
+            reverse, values = self.read_cursor(cursor)
+            queryset = queryset.filter(self.beyond(values, reverse))
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+        rows = list(queryset.order_by(*ordering)[:size + 1])
+        more = len(rows) > size
+        del rows[size:]
+        if reverse:
+            rows.reverse()
+
+        # Paging back, the page we came from always follows
+        has_next = True if reverse else more
+        has_previous = more if reverse else bool(cursor)
+        return (
+            rows,
+            self.cursor_for(rows[-1]) if rows and has_next else None,
+            self.cursor_for(rows[0], reverse=True) if rows and has_previous else None,
+        )
@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from ...models import Genre, Language, Movie
+from ...serializers import MovieListSerializer, movie_list_rows, serialize_movie_list
+
+GENRES = 'Action Drama Comedy Thriller Romance Horror Animation Documentary'.split()
+LANGUAGES = [('English', 'en'), ('Hindi', 'hi'), ('Tamil', 'ta'), ('Telugu', 'te'), ('Malayalam', 'ml')]
+
+
+class Command(BaseCommand):
+    help = 'Compare queries and time per page of movie list serialization paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 500],
+                            help='Page sizes to serialize')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per page size and path')
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        paths = [
+            ('serializer', lambda queryset: MovieListSerializer(queryset, many=True).data),
+            ('prefetched', lambda queryset: MovieListSerializer(
+                queryset.prefetch_related('genres', 'languages'), many=True
+            ).data),
+            ('rows', lambda queryset: serialize_movie_list(movie_list_rows(queryset))),
+        ]
+
+        # Everything is rolled back, leaving the catalogue untouched
+        with transaction.atomic():
+            self.populate(max(sizes), random.Random(0))
+            self.stdout.write(f'{"rows":>6}{"path":>12}{"queries":>9}{"ms":>9}')
+            for size in sizes:
+                queryset = Movie.objects.filter(is_active=True).order_by('-release_date', '-id')[:size]
+                for name, serialize in paths:
+                    queries, ms = self.measure(serialize, queryset, options['repeat'])
+                    self.stdout.write(f'{size:>6}{name:>12}{queries:>9}{ms:>9.1f}')
+            transaction.set_rollback(True)
+
+    def populate(self, count, rng):
+        genres = [Genre.objects.get_or_create(name=name)[0] for name in GENRES]
+        languages = [Language.objects.get_or_create(name=name, defaults={'code': code})[0] for name, code in LANGUAGES]
+        movies = Movie.objects.bulk_create([
+            Movie(
+                title=f'Benchmark Movie {i}',
+                description='A synthetic movie',
+                duration=rng.randint(80, 180),
+                release_date=date(2000, 1, 1) + timedelta(days=rng.randint(0, 9000)),
+                certification=rng.choice(Movie.CERTIFICATION_CHOICES)[0],
+                status=rng.choice(Movie.MOVIE_STATUS_CHOICES)[0],
+                director='Director',
+                cast=['Actor One', 'Actor Two'],
+                average_rating=round(rng.uniform(0, 5), 1),
+                total_reviews=rng.randint(0, 500),
+            )
+            for i in range(count)
+        ])
+        Movie.genres.through.objects.bulk_create([
+            Movie.genres.through(movie_id=movie.id, genre_id=genre.id)
+            for movie in movies
+            for genre in rng.sample(genres, rng.randint(1, 3))
+        ])
+        Movie.languages.through.objects.bulk_create([
+            Movie.languages.through(movie_id=movie.id, language_id=language.id)
+            for movie in movies
+            for language in rng.sample(languages, rng.randint(1, 2))
+        ])
+
+    def measure(self, serialize, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                serialize(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+        return len(queries), statistics.median(timings)
@@ -0,0 +1,82 @@
+import statistics
+import time
+from datetime import date
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from ...models import Movie
+from ...recommendations import NEIGHBOURS, build_neighbours, rank_neighbours, save_neighbours
+
+
+class Command(BaseCommand):
+    help = 'Time the recommendation build on synthetic interactions and the per-request merge'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interactions', type=int, default=1_000_000,
+                            help='Synthetic user/movie interactions')
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--movies', type=int, default=5_000)
+        parser.add_argument('--neighbours', type=int, default=NEIGHBOURS,
+                            help='Similar movies stored per movie')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Users whose recommendations are merged')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        users, movies, weights = self.interactions(rng, options)
+        started = time.perf_counter()
+        movie_index, neighbours, scores = build_neighbours(users, movies, weights, options['neighbours'])
+        self.stdout.write(
+            f'Build: {len(users)} interactions of {options["users"]} users and {options["movies"]} movies '
+            f'-> {len(neighbours)} neighbours in {time.perf_counter() - started:.2f}s'
+        )
+
+        # Everything is rolled back, leaving the catalogue untouched
+        with transaction.atomic():
+            movie_ids = self.populate(options['movies'])
+            save_neighbours(movie_ids, movie_index, neighbours, scores)
+
+            order = np.argsort(users, kind='stable')
+            starts = np.searchsorted(users[order], np.arange(options['users'] + 1))
+            timings, queries = [], 0
+            for user in rng.choice(options['users'], options['requests'], replace=False):
+                rows = order[starts[user]:starts[user + 1]]
+                seen = {movie_ids[movie]: weight for movie, weight in zip(movies[rows].tolist(), weights[rows].tolist())}
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    rank_neighbours(seen)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries = max(queries, len(captured))
+            transaction.set_rollback(True)
+
+        timings.sort()
+        self.stdout.write(
+            f'Request: {queries} query, median {statistics.median(timings):.2f} ms, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms over {len(timings)} users'
+        )
+
+    def interactions(self, rng, options):
+        # Popularity falls off with rank, as it does in a real catalogue
+        popularity = 1 / np.arange(1, options['movies'] + 1) ** 0.8
+        users = rng.integers(0, options['users'], options['interactions'])
+        movies = rng.choice(options['movies'], options['interactions'], p=popularity / popularity.sum())
+        # One entry per user and movie, as load_interactions gives
+        pairs = np.unique(users * options['movies'] + movies)
+        weights = rng.choice([1 / 3, 0.5, 2 / 3, 1.0], len(pairs))
+        return pairs // options['movies'], pairs % options['movies'], weights
+
+    def populate(self, count):
+        movies = Movie.objects.bulk_create([
+            Movie(
+                title=f'Benchmark Movie {i}',
+                description='A synthetic movie',
+                duration=120,
+                release_date=date(2000, 1, 1),
+                certification='U',
+                status='now_showing',
+                director='Director',
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        return [movie.id for movie in movies]
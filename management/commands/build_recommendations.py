@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from ...recommendations import NEIGHBOURS, build_neighbours, load_interactions, save_neighbours
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the similar movies behind recommendations from bookings, wishlists and reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbours', type=int, default=NEIGHBOURS,
+                            help='Similar movies stored per movie')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Build the neighbours without storing them')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        movie_ids, users, movies, weights = load_interactions()
+        loaded = time.monotonic()
+        movie_index, neighbours, scores = build_neighbours(users, movies, weights, options['neighbours'])
+        built = time.monotonic()
+        if not options['dry_run']:
+            save_neighbours(movie_ids, movie_index, neighbours, scores)
+
+        action = 'Built' if options['dry_run'] else 'Stored'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {len(neighbours)} neighbours for {len(set(movie_index.tolist()))} movies '
+            f'from {len(users)} interactions: loaded in {loaded - started:.2f}s, '
+            f'built in {built - loaded:.2f}s, total {time.monotonic() - started:.2f}s'
+        ))
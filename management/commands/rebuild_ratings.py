@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from ...models import Movie
+from ...ratings import STARS, update_ratings
+
+
+class Command(BaseCommand):
+    help = 'Repair movie rating totals and histograms that drifted from the reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without repairing it')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stored = ['total_reviews', 'rating_sum', 'average_rating'] + [f'ratings_{star}' for star in STARS]
+        counted = {f'counted_{star}': Count('reviews', filter=Q(reviews__rating=star)) for star in STARS}
+
+        rows = Movie.objects.order_by().annotate(
+            review_count=Count('reviews'),
+            review_sum=Coalesce(Sum('reviews__rating'), 0),
+            **counted
+        ).values_list('id', *stored, 'review_count', 'review_sum', *counted)
+
+        checked = drifted = 0
+        for movie_id, count, total, average, *values in rows:
+            checked += 1
+            histogram, (review_count, review_sum), expected = values[:5], values[5:7], values[7:]
+            stars = {star: want - have for star, have, want in zip(STARS, histogram, expected)}
+            exact = review_sum / review_count if review_count else 0.0
+            # average_rating is rounded to one decimal
+            if count == review_count and total == review_sum and not any(stars.values()) \
+                    and abs(average - exact) <= 0.05 + 1e-9:
+                continue
+
+            drifted += 1
+            self.stdout.write(
+                f'  Movie {movie_id}: {count} reviews totalling {total}, '
+                f'expected {review_count} totalling {review_sum}'
+            )
+            if not options['dry_run']:
+                # Apply deltas rather than absolute values so concurrent reviews are not lost
+                update_ratings(movie_id, review_count - count, review_sum - total, stars)
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} drift on {drifted} of {checked} movies '
+            f'in {time.monotonic() - started:.2f}s'
+        ))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -84,6 +85,15 @@ class Movie(models.Model):
     )
     total_reviews = models.PositiveIntegerField(default=0)
     
+    # Running totals kept by ratings.record_ratings. The app ships no
+    # migrations; see ratings.backfill_ratings for the one adding these
+    rating_sum = models.PositiveIntegerField(default=0)
+    ratings_1 = models.PositiveIntegerField(default=0)
+    ratings_2 = models.PositiveIntegerField(default=0)
+    ratings_3 = models.PositiveIntegerField(default=0)
+    ratings_4 = models.PositiveIntegerField(default=0)
+    ratings_5 = models.PositiveIntegerField(default=0)
+    
     # Metadata
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -110,6 +120,11 @@ class Movie(models.Model):
         today = timezone.now().date()
         return self.status == 'coming_soon' and self.release_date > today
     
+    @property
+    def rating_distribution(self):
+        """Number of reviews giving each star rating, 1 to 5"""
+        return {star: getattr(self, f'ratings_{star}') for star in range(1, 6)}
+    
     def get_duration_display(self):
         hours = self.duration // 60
         minutes = self.duration % 60
@@ -122,7 +137,7 @@ class MovieReview(models.Model):
     """User reviews for movies"""
     
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='reviews')
-    user = models.ForeignKey('users.User', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     rating = models.PositiveIntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
@@ -159,7 +174,7 @@ class MovieFormat(models.Model):
 class MovieWishlist(models.Model):
     """User wishlist for movies"""
     
-    user = models.ForeignKey('users.User', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -170,3 +185,19 @@ class MovieWishlist(models.Model):
     
     def __str__(self):
         return f"{self.user.email} - {self.movie.title}"
+
+
+class MovieNeighbour(models.Model):
+    """A movie liked by the same people as another, built by recommendations.build_neighbours and stored by save_neighbours"""
+    
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='neighbours')
+    neighbour = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    
+    class Meta:
+        db_table = 'movie_neighbours'
+        unique_together = ['movie', 'neighbour']
+        ordering = ['movie', '-score']
+    
+    def __str__(self):
+        return f"{self.movie.title} -> {self.neighbour.title} ({self.score:.3f})"
@@ -1,7 +1,17 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
 from .models import Movie, Theater, Showtime
 
 
+class ShowtimeActionForm(ActionForm):
+    target_showtime = forms.IntegerField(
+        required=False,
+        label='Target showtime ID',
+        help_text='Used when moving bookings'
+    )
+
+
 @admin.register(Movie)
 class MovieAdmin(admin.ModelAdmin):
     list_display = ['title', 'genre', 'rating', 'duration', 'release_date', 'is_active']
@@ -28,3 +38,31 @@ class ShowtimeAdmin(admin.ModelAdmin):
     list_editable = ['price', 'is_active']
     date_hierarchy = 'show_date'
     ordering = ['show_date', 'show_time']
+    action_form = ShowtimeActionForm
+    actions = ['cancel_all_bookings', 'move_all_bookings']
+
+    @admin.action(description='Cancel all bookings for selected showtimes')
+    def cancel_all_bookings(self, request, queryset):
+        from bookings.showtimes import void_showtime
+
+        for showtime in queryset:
+            result = void_showtime(showtime)
+            self.message_user(request, f'{showtime}: {result}', messages.SUCCESS)
+
+    @admin.action(description='Move all bookings to the target showtime')
+    def move_all_bookings(self, request, queryset):
+        from bookings.reservations import SeatUnavailable
+        from bookings.showtimes import move_showtime
+
+        target = Showtime.objects.filter(id=request.POST.get('target_showtime') or None).first()
+        if target is None:
+            self.message_user(request, 'Enter a valid target showtime ID.', messages.ERROR)
+            return
+
+        for showtime in queryset.exclude(id=target.id):
+            try:
+                result = move_showtime(showtime, target)
+            except SeatUnavailable as e:
+                self.message_user(request, f'{showtime} -> {target}: {e}', messages.ERROR)
+                continue
+            self.message_user(request, f'{showtime} -> {target}: {result}', messages.SUCCESS)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page
+from .pagination import CURSOR_PARAM, KeysetPage
+
+VERSION_KEY = 'movielist:version'
+LISTING_KEY = 'movielist:%s:%s:%s'
+STATS_KEY = 'movielist:stats:%s'
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a flushed cache never reuses an old version
+        version = time.time_ns() // 1000
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def invalidate_listings():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns() // 1000, None)
+
+
+def listing_key(name, params):
+    digest = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return LISTING_KEY % (current_version(), name, digest)
+
+
+def _count(outcome):
+    key = STATS_KEY % outcome
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def cached_listing(name, params, build):
+    """
+    Return ``build()`` for a movie listing, cached until movies or
+    showtimes change.
+
+    ``params`` are whatever the listing varies by (page, genre, search).
+    """
+    key = listing_key(name, params)
+    value = cache.get(key)
+    if value is not None:
+        _count('hits')
+        return value
+
+    _count('misses')
+    value = build()
+    cache.set(key, value, getattr(settings, 'MOVIE_LISTING_TTL', 300))
+    return value
+
+
+def listing_stats():
+    hits = cache.get(STATS_KEY % 'hits', 0)
+    misses = cache.get(STATS_KEY % 'misses', 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 3) if lookups else None,
+        'version': current_version(),
+    }
+
+
+class CachedListMixin:
+    """
+    Caches the current page of a ``ListView``.
+
+    Only the page's objects, its number and the total count are cached;
+    the paginator is rebuilt around them, so a hit runs no queries.
+    Cursor pages from ``KeysetPaginationMixin`` are cached whole.
+    """
+
+    listing_name = None
+
+    def get_listing_params(self):
+        params = {'page': self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1}
+        cursor = self.request.GET.get(CURSOR_PARAM)
+        if cursor is not None:
+            params['cursor'] = cursor
+        return params
+
+    def paginate_queryset(self, queryset, page_size):
+        def build():
+            paginator, page, object_list, is_paginated = super(CachedListMixin, self).paginate_queryset(
+                queryset, page_size
+            )
+            if isinstance(page, KeysetPage):
+                # Keyset pages hold nothing but their rows and cursors
+                return page
+            return page.number, list(object_list), paginator.count
+
+        value = cached_listing(self.listing_name, self.get_listing_params(), build)
+        if isinstance(value, KeysetPage):
+            return self.get_keyset_paginator(queryset, page_size), value, value.object_list, value.has_other_pages()
+
+        number, object_list, count = value
+        paginator = self.get_paginator(
+            queryset,
+            page_size,
+            orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty()
+        )
+        paginator.count = count
+        page = Page(object_list, number, paginator)
+        return paginator, page, object_list, page.has_other_pages()
@@ -0,0 +1,88 @@
+import random
+from itertools import accumulate
+import statistics
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from movies.models import Movie
+from movies.search import movie_index
+
+COMMON_WORDS = (
+    'night city last shadow river king queen star dark light storm road home war love '
+    'ghost garden winter summer secret journey empire fire island ocean machine dream'
+).split()
+SYLLABLES = 'ka ri mo lu sen dar vi to na el or an'.split()
+NAMES = (
+    'Aarav Priya Rohan Meera Arjun Kavya Vikram Ananya Rahul Sneha Karan Diya Aditya '
+    'Ishaan Nisha Dev Tara Kabir Zoya Neel'
+).split()
+SURNAMES = 'Sharma Iyer Khan Reddy Patel Nair Gupta Rao Menon Das Kapoor Bose'.split()
+
+
+class Command(BaseCommand):
+    help = 'Compare icontains and full-text movie search latency on a synthetic catalogue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=100000,
+                            help='Synthetic movies to search through')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per query')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        # Common words first, then made-up ones getting rarer down a Zipf curve
+        self.words = COMMON_WORDS + [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+        self.cum_weights = list(accumulate(1 / rank for rank in range(1, len(self.words) + 1)))
+
+        # Everything is rolled back, leaving the catalogue untouched
+        with transaction.atomic():
+            self.populate(options['movies'], rng)
+            queries = ['night', 'ghost island', self.words[300], self.words[1500], 'Sharma', 'Ishaan Men']
+            self.stdout.write(f'{"query":<14}{"matches":>9}{"icontains ms":>15}{"fts ms":>10}')
+            for query in queries:
+                scan = Movie.objects.filter(is_active=True).filter(
+                    Q(title__icontains=query) | Q(director__icontains=query) |
+                    Q(cast__icontains=query) | Q(description__icontains=query)
+                ).order_by('-release_date')
+                ranked = movie_index.search(
+                    Movie.objects.filter(is_active=True), query
+                ).order_by('search_rank', '-release_date')
+                scan_ms = self.measure(scan, options['repeat'])
+                ranked_ms = self.measure(ranked, options['repeat'])
+                self.stdout.write(f'{query:<14}{ranked.count():>9}{scan_ms:>15.1f}{ranked_ms:>10.1f}')
+            transaction.set_rollback(True)
+
+    def populate(self, count, rng):
+        started = time.monotonic()
+        batch = []
+        for i in range(count):
+            batch.append(Movie(
+                title=' '.join(word.title() for word in self.sample(rng, rng.randint(1, 4))),
+                description=' '.join(self.sample(rng, 30)),
+                genre=rng.choice(Movie.GENRE_CHOICES)[0],
+                rating=rng.choice(Movie.RATING_CHOICES)[0],
+                duration=rng.randint(80, 180),
+                release_date=date(2000, 1, 1) + timedelta(days=rng.randint(0, 9000)),
+                director=f'{rng.choice(NAMES)} {rng.choice(SURNAMES)}',
+                cast=', '.join(f'{rng.choice(NAMES)} {rng.choice(SURNAMES)}' for _ in range(4)),
+            ))
+            if len(batch) == 5000:
+                Movie.objects.bulk_create(batch)
+                batch = []
+        Movie.objects.bulk_create(batch)
+        self.stdout.write(f'Created {count} movies in {time.monotonic() - started:.1f}s')
+
+    def sample(self, rng, count):
+        return rng.choices(self.words, cum_weights=self.cum_weights, k=count)
+
+    def measure(self, queryset, repeat):
+        # One listing page plus its paginator count, as MovieListView runs it
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queryset.count()
+            list(queryset[:12])
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from movies.search import movie_index
+
+
+class Command(BaseCommand):
+    help = 'Create the movie full-text search index if needed and re-read every movie into it'
+
+    def handle(self, *args, **options):
+        connection = movie_index.get_connection()
+        if connection.vendor != 'sqlite':
+            self.stdout.write('Full-text search index is only used on SQLite')
+            return
+        movie_index.install(connection)
+        movie_index.rebuild(connection)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {movie_index.table}'))
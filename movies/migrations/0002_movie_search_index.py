@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install_index(apps, schema_editor):
+    from movies.search import SearchIndex, movie_index
+    index = SearchIndex(apps.get_model('movies', 'Movie'), movie_index.weights)
+    index.install(schema_editor.connection)
+
+
+def uninstall_index(apps, schema_editor):
+    from movies.search import SearchIndex, movie_index
+    index = SearchIndex(apps.get_model('movies', 'Movie'), movie_index.weights)
+    index.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_index, uninstall_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['release_date'], name='movie_active_release_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['genre', 'release_date'], name='movie_active_genre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['movie', 'show_date', 'show_time'], name='showtime_active_movie_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 
 class Movie(models.Model):
@@ -41,6 +43,14 @@ class Movie(models.Model):
 
     class Meta:
         ordering = ['-release_date']
+        indexes = [
+            # Django compiles is_active=True to a bare column test, which
+            # only a partial index on the same condition can serve
+            models.Index(fields=['release_date'], condition=models.Q(is_active=True),
+                         name='movie_active_release_idx'),
+            models.Index(fields=['genre', 'release_date'], condition=models.Q(is_active=True),
+                         name='movie_active_genre_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -80,11 +90,23 @@ class Showtime(models.Model):
     class Meta:
         unique_together = ['theater', 'show_date', 'show_time']
         ordering = ['show_date', 'show_time']
+        indexes = [
+            models.Index(fields=['movie', 'show_date', 'show_time'], condition=models.Q(is_active=True),
+                         name='showtime_active_movie_idx'),
+        ]
 
     def __str__(self):
         return f"{self.movie.title} - {self.show_date} {self.show_time}"
 
     def save(self, *args, **kwargs):
-        if not self.available_seats:
+        # Only default on creation; a sold-out showtime legitimately has 0
+        if self._state.adding and not self.available_seats:
             self.available_seats = self.theater.total_seats
         super().save(*args, **kwargs)
+
+
+@receiver([post_save, post_delete], sender=Movie)
+@receiver([post_save, post_delete], sender=Showtime)
+def invalidate_movie_listings(sender, instance, **kwargs):
+    from .caching import invalidate_listings
+    invalidate_listings()
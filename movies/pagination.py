@@ -0,0 +1,83 @@
+from django.http import Http404
+from common.keyset import InvalidCursor, Keyset
+
+CURSOR_PARAM = 'cursor'
+
+
+class KeysetPage:
+    """A page of a ``KeysetPaginator``; plain data, so it can be cached."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Pages a queryset with a ``common.keyset.Keyset`` on ``ordering``,
+    which must end in a unique field, e.g. ``('-release_date', '-id')``.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.keyset = Keyset(queryset.model, ordering)
+
+    def cursor_for(self, obj, reverse=False):
+        return self.keyset.cursor_for(obj, reverse)
+
+    def page(self, cursor=None):
+        """Return the page after ``cursor``, or the first page without one."""
+        return KeysetPage(*self.keyset.page(self.queryset, self.per_page, cursor))
+
+
+class KeysetPaginationMixin:
+    """
+    Cursor pagination for a ``ListView``.
+
+    Requests with a ``?cursor=`` parameter (empty for the first page) are
+    paged by ``keyset`` instead of page number, so deep pages cost the same
+    as the first one. ``page_obj`` is then a ``KeysetPage`` carrying
+    ``next_cursor`` and ``previous_cursor``. Requests without the parameter
+    keep numbered pages.
+    """
+
+    keyset = None
+    cursor_param = CURSOR_PARAM
+
+    def get_keyset(self):
+        return self.keyset
+
+    def get_keyset_paginator(self, queryset, page_size):
+        return KeysetPaginator(queryset, page_size, self.get_keyset())
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_param)
+        if cursor is None or self.get_keyset() is None:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = self.get_keyset_paginator(queryset, page_size)
+        try:
+            page = paginator.page(cursor)
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,4 @@
+from common.fts import SearchIndex
+from .models import Movie
+
+movie_index = SearchIndex(Movie, {'title': 10, 'director': 4, 'cast': 3, 'description': 1})
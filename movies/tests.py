@@ -1,3 +1,126 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from bookings.tests import QueryPlanTestCase, create_showtime
+from .caching import listing_stats
+from .models import Movie
+from .pagination import InvalidCursor, KeysetPaginator
+from .views import HomeView, MovieDetailView, MovieListView, ShowtimeListView
 
-# Create your tests here.
+
+def create_movies(count):
+    Movie.objects.bulk_create([
+        Movie(
+            title=f'Movie {number}',
+            description='A test movie',
+            genre='ACTION',
+            rating='PG',
+            duration=120,
+            # Few distinct dates, so pages split runs of equal release dates
+            release_date=date(2024, 1, 1) + timedelta(days=number % 4),
+            director='Director',
+            cast='Actor One'
+        )
+        for number in range(count)
+    ])
+
+
+class MovieQueryPlanTests(QueryPlanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.showtime = create_showtime()
+        self.movie = self.showtime.movie
+
+    def test_home(self):
+        self.assertViewIndexed(HomeView)
+
+    def test_movie_list(self):
+        self.assertViewIndexed(MovieListView)
+
+    def test_movie_list_cursor(self):
+        create_movies(30)
+        paginator = KeysetPaginator(Movie.objects.filter(is_active=True), 12, MovieListView.keyset)
+        cursor = paginator.page().next_cursor
+        self.assertViewIndexed(MovieListView, f'/?cursor={cursor}')
+
+    def test_movie_list_by_genre(self):
+        self.assertViewIndexed(MovieListView, '/?genre=ACTION')
+
+    def test_movie_detail(self):
+        response = self.assertViewIndexed(MovieDetailView, pk=self.movie.pk)
+        self.assertEqual(response.status_code, 200)
+
+    def test_showtime_list(self):
+        self.assertViewIndexed(ShowtimeListView, movie_id=self.movie.pk)
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        create_movies(25)
+        self.paginator = KeysetPaginator(Movie.objects.all(), 4, ('-release_date', '-id'))
+        self.expected = list(Movie.objects.order_by('-release_date', '-id'))
+
+    def test_pages_forward_and_back(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(pages[-1].next_cursor))
+        self.assertEqual([movie for page in pages for movie in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = []
+        page = pages[-1]
+        while page.has_previous():
+            page = self.paginator.page(page.previous_cursor)
+            previous = page.object_list + previous
+        self.assertEqual(previous + pages[-1].object_list, self.expected)
+
+    def test_page_runs_no_count(self):
+        cursor = self.paginator.page().next_cursor
+        with self.assertNumQueries(1):
+            self.paginator.page(cursor)
+
+    def test_rejects_tampered_cursor(self):
+        for cursor in ['not-a-cursor', 'WyJ4Il0', 'W2ZhbHNlLFsibm90IGEgZGF0ZSIsIjEiXV0']:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginator.page(cursor)
+
+
+class CachedListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.showtime = create_showtime()
+        self.movie = self.showtime.movie
+
+    def titles(self):
+        # Templates are not rendered, only the context the view builds
+        response = MovieListView.as_view()(RequestFactory().get('/'))
+        return [movie.title for movie in response.context_data['movies']]
+
+    def test_repeat_request_is_a_hit(self):
+        self.assertEqual(self.titles(), ['Test Movie'])
+        self.assertEqual(self.titles(), ['Test Movie'])
+
+        stats = listing_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 1, 0.5))
+
+    def test_movie_save_invalidates_listing(self):
+        self.titles()
+        version = listing_stats()['version']
+
+        self.movie.title = 'Renamed Movie'
+        self.movie.save()
+
+        self.assertNotEqual(listing_stats()['version'], version)
+        self.assertEqual(self.titles(), ['Renamed Movie'])
+        self.assertEqual(listing_stats()['misses'], 2)
+
+    def test_showtime_save_invalidates_listing(self):
+        self.titles()
+        version = listing_stats()['version']
+
+        self.showtime.is_active = False
+        self.showtime.save()
+
+        self.assertNotEqual(listing_stats()['version'], version)
+        self.titles()
+        self.assertEqual((listing_stats()['hits'], listing_stats()['misses']), (0, 2))
@@ -7,4 +7,5 @@ urlpatterns = [
     path('', views.MovieListView.as_view(), name='movie_list'),
     path('<int:pk>/', views.MovieDetailView.as_view(), name='movie_detail'),
     path('<int:movie_id>/showtimes/', views.ShowtimeListView.as_view(), name='showtime_list'),
+    path('cache-stats/', views.ListingCacheStatsView.as_view(), name='cache_stats'),
 ]
@@ -1,33 +1,57 @@
 from django.shortcuts import render, get_object_or_404
-from django.views.generic import ListView, DetailView
+from django.views.generic import ListView, DetailView, View
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.http import JsonResponse
 from django.utils import timezone
 from datetime import date
+from .caching import CachedListMixin, cached_listing, listing_stats
 from .models import Movie, Showtime
+from .pagination import KeysetPaginationMixin
+from .search import movie_index
 
 
-class HomeView(ListView):
+class HomeView(CachedListMixin, KeysetPaginationMixin, ListView):
     model = Movie
     template_name = 'movies/home.html'
     context_object_name = 'movies'
     paginate_by = 6
+    listing_name = 'home'
+    keyset = ('-release_date', '-id')
 
     def get_queryset(self):
         return Movie.objects.filter(is_active=True).order_by('-release_date')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['featured_movies'] = Movie.objects.filter(
-            is_active=True,
-            release_date__lte=date.today()
-        ).order_by('-release_date')[:3]
+        today = date.today()
+        context['featured_movies'] = cached_listing('featured', {'date': today.isoformat()}, lambda: list(
+            Movie.objects.filter(
+                is_active=True,
+                release_date__lte=today
+            ).order_by('-release_date')[:3]
+        ))
         return context
 
 
-class MovieListView(ListView):
+class MovieListView(CachedListMixin, KeysetPaginationMixin, ListView):
     model = Movie
     template_name = 'movies/movie_list.html'
     context_object_name = 'movies'
     paginate_by = 12
+    listing_name = 'movies'
+    keyset = ('-release_date', '-id')
+
+    def get_keyset(self):
+        # Search results are ordered by rank, so they keep numbered pages
+        if self.request.GET.get('search'):
+            return None
+        return super().get_keyset()
+
+    def get_listing_params(self):
+        params = super().get_listing_params()
+        params['genre'] = self.request.GET.get('genre', '')
+        params['search'] = self.request.GET.get('search', '')
+        return params
 
     def get_queryset(self):
         queryset = Movie.objects.filter(is_active=True)
@@ -37,10 +61,10 @@ class MovieListView(ListView):
         if genre:
             queryset = queryset.filter(genre=genre)
 
-        # Search functionality
+        # Search functionality, best matches first
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(title__icontains=search)
+            return movie_index.search(queryset, search).order_by('search_rank', '-release_date')
 
         return queryset.order_by('-release_date')
 
@@ -85,3 +109,11 @@ class ShowtimeListView(ListView):
         context = super().get_context_data(**kwargs)
         context['movie'] = get_object_or_404(Movie, id=self.kwargs['movie_id'])
         return context
+
+
+class ListingCacheStatsView(UserPassesTestMixin, View):
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return JsonResponse(listing_stats())
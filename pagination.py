@@ -0,0 +1,99 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from .common.keyset import InvalidCursor, Keyset
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the queryset's ordering, with the primary key
+    appended as a tie-breaker.
+
+    Each page is one range query from the last row seen, with no OFFSET
+    and no COUNT(*), so deep pages cost the same as the first. Cursors are
+    opaque; clients follow the ``next`` and ``previous`` links.
+    """
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        keyset = Keyset(queryset.model, self.get_ordering(queryset))
+        cursor = request.query_params.get(self.cursor_query_param)
+        try:
+            rows, self.next_cursor, self.previous_cursor = keyset.page(
+                queryset, self.get_page_size(request), cursor
+            )
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return rows
+
+    def get_ordering(self, queryset):
+        pk = queryset.model._meta.pk.name
+        ordering = [
+            f'-{pk}' if name == '-pk' else pk if name == 'pk' else name
+            for name in queryset.query.order_by or queryset.model._meta.ordering
+        ]
+        if not ordering or ordering[-1].lstrip('-') != pk:
+            descending = not ordering or ordering[0].startswith('-')
+            ordering.append(f'-{pk}' if descending else pk)
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_cursor),
+            'previous': self.get_link(self.previous_cursor),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    Cursor pagination for a generic view, on request.
+
+    Requests with a ``?cursor=`` parameter (empty for the first page) are
+    paged by ``keyset_pagination_class``. Other requests keep the
+    project's ``DEFAULT_PAGINATION_CLASS``, so existing clients see the
+    responses they always did.
+    """
+
+    keyset_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.keyset_pagination_class.cursor_query_param in self.request.query_params:
+                pagination_class = self.keyset_pagination_class
+            else:
+                pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from bookings.models import Booking
 import uuid
@@ -52,15 +52,42 @@ class Payment(models.Model):
         return self.status == 'COMPLETED'
 
     def mark_completed(self):
+        """
+        Record the payment and confirm its booking.
+
+        The booking is confirmed only while it is still PENDING and inside
+        its payment deadline; a hold the sweeper already expired may have
+        lost its seats to someone else. The payment is then left FAILED
+        and flagged for refund instead. Returns whether the booking was
+        confirmed.
+        """
         from django.utils import timezone
-        self.status = 'COMPLETED'
-        self.completed_at = timezone.now()
-        self.save()
-
-        # Update booking status
-        self.booking.status = 'CONFIRMED'
-        self.booking.confirmation_time = timezone.now()
-        self.booking.save()
+        now = timezone.now()
+
+        with transaction.atomic():
+            confirmed = Booking.objects.filter(
+                pk=self.booking_id,
+                status='PENDING',
+                payment_deadline__gte=now
+            ).update(status='CONFIRMED', confirmation_time=now)
+
+            if not confirmed:
+                self.status = 'FAILED'
+                self.refund_amount = self.amount
+                self.refund_reason = 'Booking was no longer held when the payment completed'
+                self.save()
+                return False
+
+            self.status = 'COMPLETED'
+            self.completed_at = now
+            self.save()
+
+        self.booking.refresh_from_db()
+
+        # Render the ticket in the background so downloads only stream a file
+        from bookings.ticket_queue import enqueue_tickets
+        enqueue_tickets(self.booking_id)
+        return True
 
     def mark_failed(self):
         self.status = 'FAILED'
@@ -1,3 +1,57 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from bookings.holds import expire_all_holds
+from bookings.models import Booking, Seat
+from bookings.reservations import reserve_seats
+from bookings.tests import create_showtime
+from .models import Payment
 
-# Create your tests here.
+
+@override_settings(TICKET_CACHE_DIR=tempfile.mkdtemp())
+class MarkCompletedTests(TestCase):
+    def setUp(self):
+        self.showtime = create_showtime()
+        self.user = User.objects.create_user('customer', password='secret')
+        self.seat_ids = list(Seat.objects.values_list('id', flat=True)[:2])
+        self.booking = reserve_seats(self.user, self.showtime, self.seat_ids)
+        self.payment = Payment.objects.create(
+            booking=self.booking,
+            user=self.user,
+            amount=self.booking.total_amount,
+            payment_method='STRIPE'
+        )
+
+    def test_confirms_pending_booking(self):
+        self.assertTrue(self.payment.mark_completed())
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'CONFIRMED')
+        self.assertIsNotNone(self.booking.confirmation_time)
+        self.assertEqual(self.payment.status, 'COMPLETED')
+
+    def test_late_payment_does_not_confirm_expired_hold(self):
+        Booking.objects.filter(pk=self.booking.pk).update(payment_deadline=timezone.now() - timedelta(minutes=1))
+        expire_all_holds()
+        # Someone else takes the released seats
+        other = User.objects.create_user('other', password='secret')
+        reserve_seats(other, self.showtime, self.seat_ids)
+
+        self.assertFalse(self.payment.mark_completed())
+
+        self.booking.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.booking.status, 'EXPIRED')
+        self.assertEqual(self.payment.status, 'FAILED')
+        self.assertEqual(self.payment.refund_amount, self.payment.amount)
+
+    def test_payment_after_deadline_is_refused_before_the_sweep(self):
+        Booking.objects.filter(pk=self.booking.pk).update(payment_deadline=timezone.now() - timedelta(minutes=1))
+
+        self.assertFalse(self.payment.mark_completed())
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'PENDING')
+        self.assertEqual(self.payment.status, 'FAILED')
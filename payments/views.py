@@ -49,8 +49,8 @@ class PaymentSuccessView(LoginRequiredMixin, TemplateView):
         payment = get_object_or_404(Payment, payment_id=payment_id, user=self.request.user)
 
         # Mark payment as completed if not already
-        if payment.status == 'PENDING':
-            payment.mark_completed()
+        if payment.status == 'PENDING' and not payment.mark_completed():
+            messages.error(self.request, 'Your booking expired before the payment completed. The payment will be refunded.')
 
         context['payment'] = payment
         context['booking'] = payment.booking
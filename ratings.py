@@ -0,0 +1,75 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+from . import autocomplete
+from .models import Movie
+
+STARS = range(1, 6)
+
+
+def average(count, total):
+    # Mean rating to one decimal, 0 for a movie without reviews
+    return Coalesce(Round(Cast(total, FloatField()) / NullIf(count, 0), 1), Value(0.0))
+
+
+def update_ratings(movie_id, count=0, total=0, stars=None):
+    """
+    Shift a movie's rating aggregates by the given deltas in one UPDATE.
+
+    ``count`` and ``total`` change the review count and the sum of
+    ratings, ``stars`` maps a star rating to the change in its count.
+    Deltas are applied in the database, so concurrent reviews of the
+    same movie never overwrite each other, and ``average_rating`` is
+    recomputed from the new totals in the same statement.
+    """
+    new_count = F('total_reviews') + count
+    new_total = F('rating_sum') + total
+    changes = {
+        'total_reviews': new_count,
+        'rating_sum': new_total,
+        'average_rating': average(new_count, new_total),
+        'updated_at': timezone.now(),
+    }
+    for star, delta in (stars or {}).items():
+        if delta:
+            changes[f'ratings_{star}'] = F(f'ratings_{star}') + delta
+
+    Movie.objects.filter(id=movie_id).update(**changes)
+    # The update skips post_save, so re-rank the movie's suggestions here
+    transaction.on_commit(lambda: autocomplete.refresh_score(movie_id))
+
+
+def record_ratings(movie_id, added=(), removed=()):
+    """Add the ratings of new reviews and remove those of deleted or edited ones."""
+    stars = Counter(added)
+    stars.subtract(removed)
+    update_ratings(movie_id, len(added) - len(removed), sum(added) - sum(removed), stars)
+
+
+def backfill_ratings(apps, schema_editor):
+    """
+    Fill every movie's rating totals and star counts from its reviews.
+
+    This app keeps no migrations of its own, so the project installing it
+    runs ``makemigrations movies`` and adds
+    ``migrations.RunPython(backfill_ratings, migrations.RunPython.noop)``
+    to the migration that adds those columns. Counts left at their default
+    of 0 would otherwise go below zero, and fail their check constraint,
+    as soon as an older review is deleted.
+    """
+    Movie = apps.get_model('movies', 'Movie')
+    MovieReview = apps.get_model('movies', 'MovieReview')
+
+    reviews = MovieReview.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+
+    def aggregate(expression):
+        return Coalesce(Subquery(reviews.annotate(value=expression).values('value')), 0)
+
+    Movie.objects.update(
+        total_reviews=aggregate(Count('pk')),
+        rating_sum=aggregate(Sum('rating')),
+        **{f'ratings_{star}': aggregate(Count('pk', filter=Q(rating=star))) for star in STARS}
+    )
+    Movie.objects.update(average_rating=average(F('total_reviews'), F('rating_sum')))
@@ -0,0 +1,190 @@
+from collections import defaultdict
+from django.apps import apps as django_apps
+from django.db import transaction
+from .models import MovieNeighbour, MovieReview, MovieWishlist
+
+NEIGHBOURS = 20
+RECOMMENDATIONS = 10
+# Best ranked neighbours looked up when picking the movies now showing
+CANDIDATES = 100
+# A user's pairs grow with the square of their interactions, so heavy
+# users contribute only their strongest ones
+MAX_USER_INTERACTIONS = 200
+# Similarities backed by few common users are damped toward zero
+SHRINKAGE = 10
+# Movie pairs counted at once while building, which bounds memory use
+CHUNK_PAIRS = 5_000_000
+
+BOOKING_WEIGHT = 1.0
+WISHLIST_WEIGHT = 0.5
+
+
+def review_weight(rating):
+    # Reviews below three stars say nothing about liking the movie
+    return max(rating - 2, 0) / 3
+
+
+def interactions(user=None):
+    """
+    Yield ``(user_id, movie_id, weight)`` for the confirmed bookings,
+    wishlist entries and reviews of ``user``, or of everyone.
+
+    A pair may be yielded more than once; its strongest weight counts.
+    """
+    filters = {} if user is None else {'user': user}
+    if django_apps.is_installed('apps.bookings'):
+        from apps.bookings.models import Booking
+
+        bookings = Booking.objects.filter(status='confirmed', **filters).order_by()
+        for user_id, movie_id in bookings.values_list('user_id', 'show__movie_id').iterator():
+            yield user_id, movie_id, BOOKING_WEIGHT
+
+    wishlist = MovieWishlist.objects.filter(**filters).order_by()
+    for user_id, movie_id in wishlist.values_list('user_id', 'movie_id').iterator():
+        yield user_id, movie_id, WISHLIST_WEIGHT
+
+    reviews = MovieReview.objects.filter(**filters).order_by()
+    for user_id, movie_id, rating in reviews.values_list('user_id', 'movie_id', 'rating').iterator():
+        yield user_id, movie_id, review_weight(rating)
+
+
+def load_interactions():
+    """
+    Every interaction as the arrays ``build_neighbours`` takes.
+
+    Returns ``(movie_ids, users, movies, weights)``, where ``movies``
+    holds indexes into ``movie_ids``.
+    """
+    import numpy as np
+
+    strengths = {}
+    for user_id, movie_id, weight in interactions():
+        key = (user_id, movie_id)
+        strengths[key] = max(weight, strengths.get(key, 0))
+
+    user_index, movie_index = {}, {}
+    users = np.fromiter((user_index.setdefault(user_id, len(user_index)) for user_id, movie_id in strengths),
+                        dtype=np.int64, count=len(strengths))
+    movies = np.fromiter((movie_index.setdefault(movie_id, len(movie_index)) for user_id, movie_id in strengths),
+                         dtype=np.int64, count=len(strengths))
+    weights = np.fromiter(strengths.values(), dtype=np.float64, count=len(strengths))
+    return list(movie_index), users, movies, weights
+
+
+def _groups(keys):
+    # Start and length of each run of equal values in sorted ``keys``
+    import numpy as np
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    return starts, np.diff(np.r_[starts, len(keys)])
+
+
+def _pair_sums(keys, values, support):
+    # Sum ``values`` and ``support`` of equal pair keys
+    import numpy as np
+
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return keys, np.bincount(inverse, values, len(keys)), np.bincount(inverse, support, len(keys))
+
+
+def build_neighbours(users, movies, weights, k=NEIGHBOURS):
+    """
+    Item-item cosine similarities of a sparse user x movie matrix.
+
+    The matrix is given as one entry per user and movie: ``users`` and
+    ``movies`` are integer indexes and ``weights`` the strength of the
+    interaction. Returns ``(movies, neighbours, scores)`` arrays holding
+    the ``k`` most similar movies of every movie, best first.
+
+    Co-occurrences are summed over the movie pairs of each user in
+    vectorized chunks, so the work grows with the pairs users actually
+    share rather than with the square of the catalogue.
+    """
+    import numpy as np
+
+    users = np.asarray(users, dtype=np.int64)
+    movies = np.asarray(movies, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    keep = weights > 0
+    users, movies, weights = users[keep], movies[keep], weights[keep]
+    if not len(users):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    # Group by user, strongest first, and cap each user's interactions
+    order = np.lexsort((-weights, users))
+    users, movies, weights = users[order], movies[order], weights[order]
+    starts, counts = _groups(users)
+    rank = np.arange(len(users)) - np.repeat(starts, counts)
+    keep = rank < MAX_USER_INTERACTIONS
+    users, movies, weights = users[keep], movies[keep], weights[keep]
+    starts, counts = _groups(users)
+
+    size = int(movies.max()) + 1
+    norms = np.sqrt(np.bincount(movies, weights * weights, size))
+
+    # Users are expanded a chunk at a time, each chunk holding up to
+    # CHUNK_PAIRS pairs and at least one user
+    cumulative = np.cumsum(counts * counts)
+    chunks = []
+    first = 0
+    while first < len(counts):
+        done = cumulative[first - 1] if first else 0
+        last = max(int(np.searchsorted(cumulative, done + CHUNK_PAIRS, side='right')), first + 1)
+        group_counts = counts[first:last]
+        # Every interaction paired with every interaction of the same user
+        degree = np.repeat(group_counts, group_counts)
+        left = np.repeat(np.arange(starts[first], starts[first] + group_counts.sum()), degree)
+        block = np.repeat(np.cumsum(degree) - degree, degree)
+        right = np.repeat(np.repeat(starts[first:last], group_counts), degree) + np.arange(len(left)) - block
+        distinct = left != right
+        left, right = left[distinct], right[distinct]
+        chunks.append(_pair_sums(movies[left] * size + movies[right],
+                                 weights[left] * weights[right], np.ones(len(left))))
+        first = last
+
+    keys, sums, support = _pair_sums(*(np.concatenate(arrays) for arrays in zip(*chunks)))
+    source, target = keys // size, keys % size
+    scores = sums / (norms[source] * norms[target]) * support / (support + SHRINKAGE)
+
+    # Best ``k`` of every movie
+    order = np.lexsort((-scores, source))
+    source, target, scores = source[order], target[order], scores[order]
+    starts, counts = _groups(source)
+    keep = np.arange(len(source)) - np.repeat(starts, counts) < k
+    return source[keep], target[keep], scores[keep]
+
+
+def save_neighbours(movie_ids, movies, neighbours, scores):
+    """Replace every stored neighbour with the output of ``build_neighbours``."""
+    with transaction.atomic():
+        MovieNeighbour.objects.all().delete()
+        MovieNeighbour.objects.bulk_create((
+            MovieNeighbour(movie_id=movie_ids[movie], neighbour_id=movie_ids[neighbour], score=float(score))
+            for movie, neighbour, score in zip(movies.tolist(), neighbours.tolist(), scores.tolist())
+        ), batch_size=1000)
+
+
+def user_interactions(user):
+    """The movies ``user`` has interacted with, mapped to the strongest weight."""
+    seen = {}
+    for user_id, movie_id, weight in interactions(user):
+        seen[movie_id] = max(weight, seen.get(movie_id, 0))
+    return seen
+
+
+def rank_neighbours(seen):
+    """
+    Movie ids ranked for someone who interacted with ``seen``, a mapping
+    of movie id to weight, best first and excluding ``seen`` itself.
+
+    The stored neighbours of every seen movie are read with one query and
+    merged in memory, each weighted by how strongly its movie was liked.
+    """
+    scores = defaultdict(float)
+    neighbours = MovieNeighbour.objects.filter(
+        movie_id__in=[movie_id for movie_id, weight in seen.items() if weight > 0]
+    ).order_by().values_list('movie_id', 'neighbour_id', 'score')
+    for movie_id, neighbour_id, score in neighbours:
+        if neighbour_id not in seen:
+            scores[neighbour_id] += seen[movie_id] * score
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,10 @@
+from django.db import connections
+from .common.fts import SearchIndex
+from .models import Movie
+
+movie_index = SearchIndex(Movie, {'title': 10, 'director': 4, 'cast': 3, 'description': 1})
+
+
+def install_search_index(sender, using, **kwargs):
+    """Create the movie search index after migrations have run."""
+    movie_index.install(connections[using])
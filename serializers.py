@@ -1,5 +1,11 @@
+from collections import defaultdict
+from django.apps import apps as django_apps
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import Movie, Genre, Language, MovieReview, MovieFormat, MovieWishlist
+from .user_context import user_movie_context
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -26,12 +32,40 @@ class MovieFormatSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'additional_cost']
 
 
-class MovieListSerializer(serializers.ModelSerializer):
+class UserMovieListSerializer(serializers.ListSerializer):
+    """Registers every movie of the list, so user fields are read for all at once"""
+    
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        user_context = user_movie_context(self.context.get('request'))
+        if user_context is not None:
+            user_context.add(self.child.get_movie_id(item) for item in items)
+        return super().to_representation(items)
+
+
+class UserMovieFieldsMixin:
+    """is_wishlisted and user_review for the requesting user, read once per request"""
+    
+    def get_movie_id(self, obj):
+        return obj.id
+    
+    def get_is_wishlisted(self, obj):
+        user_context = user_movie_context(self.context.get('request'))
+        return user_context is not None and user_context.is_wishlisted(obj.id)
+    
+    def get_user_review(self, obj):
+        user_context = user_movie_context(self.context.get('request'))
+        review = user_context and user_context.review(obj.id)
+        return MovieReviewSerializer(review).data if review else None
+
+
+class MovieListSerializer(UserMovieFieldsMixin, serializers.ModelSerializer):
     """Serializer for movie list view"""
     
     genres = GenreSerializer(many=True, read_only=True)
     languages = LanguageSerializer(many=True, read_only=True)
     duration_display = serializers.CharField(source='get_duration_display', read_only=True)
+    is_wishlisted = serializers.SerializerMethodField()
     
     class Meta:
         model = Movie
@@ -39,11 +73,87 @@ class MovieListSerializer(serializers.ModelSerializer):
             'id', 'title', 'poster', 'duration', 'duration_display',
             'release_date', 'genres', 'languages', 'certification',
             'status', 'average_rating', 'total_reviews', 'is_now_showing',
-            'is_coming_soon'
+            'is_coming_soon', 'is_wishlisted'
         ]
-
-
-class MovieDetailSerializer(serializers.ModelSerializer):
+        list_serializer_class = UserMovieListSerializer
+
+
+# Columns read by serialize_movie_list; ordering fields of the list views are among them
+MOVIE_LIST_VALUES = [
+    'id', 'title', 'poster', 'duration', 'release_date', 'end_date',
+    'certification', 'status', 'average_rating', 'total_reviews'
+]
+
+
+def movie_list_rows(queryset):
+    """``queryset`` as the ``values()`` rows ``serialize_movie_list`` takes."""
+    # Extra selects such as search_rank must be selected to stay orderable
+    return queryset.values(*MOVIE_LIST_VALUES, *queryset.query.extra_select)
+
+
+def _related_rows(model, movie_ids, fields):
+    # One query for the whole page, in the related model's own ordering
+    related = defaultdict(list)
+    rows = model.objects.filter(movies__in=movie_ids).values('movies', *fields)
+    for row in rows:
+        related[row.pop('movies')].append(row)
+    return related
+
+
+def serialize_movie_list(rows, request=None):
+    """
+    Build the same data as ``MovieListSerializer(many=True)`` from
+    ``movie_list_rows`` rows.
+
+    Genres and languages of all rows are read with one query each, as is
+    the requesting user's wishlist, and every movie becomes a dict
+    directly instead of going through DRF's per-field serialization.
+    """
+    rows = list(rows)
+    movie_ids = [row['id'] for row in rows]
+    genres = _related_rows(Genre, movie_ids, ['id', 'name', 'description'])
+    languages = _related_rows(Language, movie_ids, ['id', 'name', 'code'])
+    user_context = user_movie_context(request)
+    if user_context is not None:
+        user_context.add(movie_ids)
+    poster_storage = Movie._meta.get_field('poster').storage
+    date_field = serializers.DateField()
+    today = timezone.now().date()
+
+    data = []
+    for row in rows:
+        poster = row['poster'] or None
+        if poster and api_settings.UPLOADED_FILES_USE_URL:
+            poster = poster_storage.url(poster)
+            if request is not None:
+                poster = request.build_absolute_uri(poster)
+        hours, minutes = divmod(row['duration'], 60)
+        release_date, end_date = row['release_date'], row['end_date']
+        data.append({
+            'id': str(row['id']),
+            'title': row['title'],
+            'poster': poster,
+            'duration': row['duration'],
+            'duration_display': f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m",
+            'release_date': date_field.to_representation(release_date),
+            'genres': genres.get(row['id'], []),
+            'languages': languages.get(row['id'], []),
+            'certification': row['certification'],
+            'status': row['status'],
+            'average_rating': row['average_rating'],
+            'total_reviews': row['total_reviews'],
+            'is_now_showing': (
+                row['status'] == 'now_showing' and
+                release_date <= today and
+                (end_date is None or end_date >= today)
+            ),
+            'is_coming_soon': row['status'] == 'coming_soon' and release_date > today,
+            'is_wishlisted': user_context is not None and user_context.is_wishlisted(row['id']),
+        })
+    return data
+
+
+class MovieDetailSerializer(UserMovieFieldsMixin, serializers.ModelSerializer):
     """Serializer for movie detail view"""
     
     genres = GenreSerializer(many=True, read_only=True)
@@ -59,25 +169,10 @@ class MovieDetailSerializer(serializers.ModelSerializer):
             'release_date', 'end_date', 'poster', 'banner', 'trailer_url',
             'genres', 'languages', 'certification', 'status', 'director',
             'cast', 'producer', 'music_director', 'imdb_rating',
-            'average_rating', 'total_reviews', 'is_now_showing',
+            'average_rating', 'total_reviews', 'rating_distribution', 'is_now_showing',
             'is_coming_soon', 'is_wishlisted', 'user_review'
         ]
-    
-    def get_is_wishlisted(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return MovieWishlist.objects.filter(user=request.user, movie=obj).exists()
-        return False
-    
-    def get_user_review(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            try:
-                review = MovieReview.objects.get(user=request.user, movie=obj)
-                return MovieReviewSerializer(review).data
-            except MovieReview.DoesNotExist:
-                return None
-        return None
+        list_serializer_class = UserMovieListSerializer
 
 
 class MovieReviewSerializer(serializers.ModelSerializer):
@@ -99,12 +194,14 @@ class MovieReviewSerializer(serializers.ModelSerializer):
         validated_data['movie'] = self.context['movie']
         
         # Check if user has booked this movie
-        from apps.bookings.models import Booking
-        has_booking = Booking.objects.filter(
-            user=validated_data['user'],
-            show__movie=validated_data['movie'],
-            status='confirmed'
-        ).exists()
+        has_booking = False
+        if django_apps.is_installed('apps.bookings'):
+            from apps.bookings.models import Booking
+            has_booking = Booking.objects.filter(
+                user=validated_data['user'],
+                show__movie=validated_data['movie'],
+                status='confirmed'
+            ).exists()
         validated_data['is_verified_booking'] = has_booking
         
         return super().create(validated_data)
@@ -119,6 +216,10 @@ class MovieWishlistSerializer(serializers.ModelSerializer):
         model = MovieWishlist
         fields = ['id', 'movie', 'created_at']
         read_only_fields = ['id', 'created_at']
+        list_serializer_class = UserMovieListSerializer
+    
+    def get_movie_id(self, obj):
+        return obj.movie_id
 
 
 class MovieSearchSerializer(serializers.Serializer):
@@ -146,7 +247,7 @@ class MovieSearchSerializer(serializers.Serializer):
             ('-title', 'Title (Desc)'),
             ('average_rating', 'Rating'),
             ('-average_rating', 'Rating (Desc)'),
+            ('relevance', 'Relevance'),
         ],
-        required=False,
-        default='-release_date'
+        required=False
     )
@@ -0,0 +1,358 @@
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+from unittest.mock import patch
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from . import autocomplete
+from .checks import check_shared_cache
+from .models import Genre, Language, Movie, MovieNeighbour, MovieReview, MovieWishlist
+from .ratings import backfill_ratings, record_ratings
+from .recommendations import SHRINKAGE, build_neighbours
+from .serializers import MovieListSerializer, movie_list_rows, serialize_movie_list
+
+
+def create_movie(title, **fields):
+    fields = {
+        'description': 'A test movie',
+        'duration': 120,
+        'release_date': date.today(),
+        'certification': 'U',
+        'status': 'now_showing',
+        'director': 'Director',
+        'cast': ['Actor One', 'Actor Two'],
+        **fields
+    }
+    return Movie.objects.create(title=title, **fields)
+
+
+class RatingTests(APITestCase):
+    def setUp(self):
+        self.movie = create_movie('Test Movie')
+        self.users = [
+            get_user_model().objects.create_user(f'customer{i}', f'customer{i}@example.com', 'secret')
+            for i in range(3)
+        ]
+
+    def assertRatings(self, total_reviews, average_rating, distribution):
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.total_reviews, total_reviews)
+        self.assertEqual(self.movie.average_rating, average_rating)
+        self.assertEqual(self.movie.rating_distribution, {star: distribution.get(star, 0) for star in range(1, 6)})
+
+    def review(self, user, rating):
+        self.client.force_authenticate(user)
+        response = self.client.post(reverse('movie-reviews', kwargs={'movie_id': self.movie.id}), {'rating': rating})
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_updates_from_stale_instances_add_up(self):
+        stale = Movie.objects.get(id=self.movie.id)
+        record_ratings(stale.id, added=[5])
+        record_ratings(stale.id, added=[4])
+        record_ratings(stale.id, added=[3], removed=[5])
+
+        self.assertRatings(2, 3.5, {3: 1, 4: 1})
+        self.assertEqual(self.movie.rating_sum, 7)
+
+    def test_create_edit_and_delete_reviews(self):
+        self.review(self.users[0], 5)
+        review_id = self.review(self.users[1], 2)
+        self.assertRatings(2, 3.5, {2: 1, 5: 1})
+
+        detail = reverse('movie-review-detail', kwargs={'pk': review_id})
+        self.assertEqual(self.client.patch(detail, {'rating': 4}).status_code, 200)
+        self.assertRatings(2, 4.5, {4: 1, 5: 1})
+
+        self.assertEqual(self.client.delete(detail).status_code, 204)
+        self.assertEqual(self.client.delete(detail).status_code, 404)
+        self.assertRatings(1, 5.0, {5: 1})
+
+    def test_backfill_counts_existing_reviews(self):
+        for user, rating in zip(self.users, [5, 4, 4]):
+            MovieReview.objects.create(movie=self.movie, user=user, rating=rating)
+        empty = create_movie('No Reviews', average_rating=3.0)
+
+        backfill_ratings(apps, None)
+
+        self.assertRatings(3, 4.3, {4: 2, 5: 1})
+        empty.refresh_from_db()
+        self.assertEqual((empty.total_reviews, empty.average_rating), (0, 0.0))
+
+        # Deleting a review that predates the counts takes them down, not below zero
+        review = MovieReview.objects.get(user=self.users[0])
+        self.client.force_authenticate(self.users[0])
+        self.client.delete(reverse('movie-review-detail', kwargs={'pk': review.pk}))
+        self.assertRatings(2, 4.0, {4: 2})
+
+
+class AutocompleteTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        autocomplete._index = None
+        self.addCleanup(setattr, autocomplete, '_index', None)
+        self.dark = create_movie('The Dark Knight', director='Christopher Nolan',
+                                 cast=['Christian Bale'], average_rating=4.5)
+        self.darker = create_movie('Darker Than Night', director='Someone Else', average_rating=3.0)
+
+    def suggest(self, q, **params):
+        response = self.client.get(reverse('movie-autocomplete'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(suggestion['type'], suggestion['text']) for suggestion in response.data['results']]
+
+    def test_suggests_word_starts_best_rated_first(self):
+        self.assertEqual(self.suggest('dark'), [('title', 'The Dark Knight'), ('title', 'Darker Than Night')])
+        self.assertEqual(self.suggest('nol'), [('director', 'Christopher Nolan')])
+        self.assertCountEqual(self.suggest('chris'), [('director', 'Christopher Nolan'), ('cast', 'Christian Bale')])
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.suggest('dark', limit=0)), 1)
+        self.assertEqual(len(self.suggest('dark', limit=-5)), 1)
+        self.assertEqual(len(self.suggest('dark', limit=1000)), 2)
+        self.assertEqual(len(self.suggest('dark', limit='many')), 2)
+
+    def test_own_changes_apply_without_rebuild(self):
+        index = autocomplete.get_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_movie('Dark Waters', average_rating=5.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            record_ratings(self.darker.id, added=[5] * 3)
+
+        self.assertIs(autocomplete.get_index(), index)
+        self.assertEqual(self.suggest('dark'), [
+            ('title', 'Darker Than Night'), ('title', 'Dark Waters'), ('title', 'The Dark Knight')
+        ])
+
+    def test_changes_from_another_process_trigger_rebuild(self):
+        index = autocomplete.get_index()
+
+        # Another worker saved a movie: the rows and the shared version changed, this index did not
+        Movie.objects.filter(id=self.dark.id).update(title='The Bright Knight')
+        cache.incr(autocomplete.VERSION_KEY)
+
+        self.assertIsNot(autocomplete.get_index(), index)
+        self.assertEqual(self.suggest('dark'), [('title', 'Darker Than Night')])
+        self.assertEqual(self.suggest('bright'), [('title', 'The Bright Knight')])
+
+    def test_inactive_movies_are_dropped(self):
+        autocomplete.get_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dark.is_active = False
+            self.dark.save()
+
+        self.assertEqual(self.suggest('dark'), [('title', 'Darker Than Night')])
+
+    def test_uncommitted_changes_are_not_suggested(self):
+        autocomplete.get_index()
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            create_movie('Dark Waters', average_rating=5.0)
+        self.assertEqual(self.suggest('dark'), [('title', 'The Dark Knight'), ('title', 'Darker Than Night')])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.suggest('dark')[0], ('title', 'Dark Waters'))
+
+    def test_ratings_from_another_process_apply_without_rebuild(self):
+        index = autocomplete.get_index()
+        version = cache.get(autocomplete.VERSION_KEY)
+
+        # Another worker, without an index of its own, recorded the reviews
+        autocomplete._index = None
+        with self.captureOnCommitCallbacks(execute=True):
+            record_ratings(self.darker.id, added=[5] * 3)
+        autocomplete._index = index
+
+        self.assertEqual(cache.get(autocomplete.VERSION_KEY), version)
+        self.assertIs(autocomplete.get_index(), index)
+        self.assertEqual(self.suggest('dark'), [('title', 'Darker Than Night'), ('title', 'The Dark Knight')])
+
+    def test_expired_rating_log_rereads_every_score(self):
+        index = autocomplete.get_index()
+
+        autocomplete._index = None
+        with self.captureOnCommitCallbacks(execute=True):
+            record_ratings(self.darker.id, added=[5] * 3)
+        autocomplete._index = index
+        cache.delete(autocomplete.SCORE_CHANGE_KEY % cache.get(autocomplete.SCORES_KEY))
+
+        self.assertIs(autocomplete.get_index(), index)
+        self.assertEqual(self.suggest('dark')[0], ('title', 'Darker Than Night'))
+
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        for number in range(9):
+            # Few distinct dates, so pages split runs of equal release dates
+            create_movie(f'Movie {number}', release_date=date(2024, 1, 1 + number % 3))
+        self.expected = [str(movie_id) for movie_id in Movie.objects.order_by(
+            '-release_date', '-id'
+        ).values_list('id', flat=True)]
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_pages_forward_and_back(self):
+        pages = [self.get(reverse('movie-list'), cursor='', page_size=4)]
+        while pages[-1]['next']:
+            pages.append(self.get(pages[-1]['next']))
+        self.assertEqual([movie['id'] for page in pages for movie in page['results']], self.expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        back = self.get(pages[-1]['previous'])
+        self.assertEqual(back['results'], pages[-2]['results'])
+
+    def test_rejects_tampered_cursor(self):
+        response = self.client.get(reverse('movie-list'), {'cursor': 'WyJ4Il0'})
+        self.assertEqual(response.status_code, 404)
+
+
+class SerializeMovieListTests(APITestCase):
+    def setUp(self):
+        today = date.today()
+        action = Genre.objects.create(name='Action', description='Action films')
+        drama = Genre.objects.create(name='Drama')
+        english = Language.objects.create(name='English', code='en')
+        self.user = get_user_model().objects.create_user('customer', 'customer@example.com', 'secret')
+
+        showing = create_movie('Showing', duration=125, poster='movie_posters/showing.jpg',
+                               release_date=today - timedelta(days=3), average_rating=4.5, total_reviews=2)
+        showing.genres.set([action, drama])
+        showing.languages.set([english])
+        ended = create_movie('Ended', duration=60, status='ended',
+                             release_date=today - timedelta(days=30), end_date=today - timedelta(days=1))
+        ended.genres.set([drama])
+        create_movie('Coming', duration=45, status='coming_soon', release_date=today + timedelta(days=7))
+        MovieWishlist.objects.create(user=self.user, movie=showing)
+
+    def assertSameData(self, request):
+        movies = Movie.objects.order_by('-release_date', 'id')
+        expected = MovieListSerializer(movies, many=True, context={'request': request}).data
+        self.assertEqual(serialize_movie_list(movie_list_rows(movies), request), expected)
+        return expected
+
+    def test_matches_serializer(self):
+        self.assertSameData(Request(APIRequestFactory().get('/')))
+
+    def test_matches_serializer_for_user(self):
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, self.user)
+        data = self.assertSameData(Request(request))
+        self.assertEqual([movie['is_wishlisted'] for movie in data], [False, True, False])
+
+
+class BuildNeighboursTests(SimpleTestCase):
+    # Users x movies; user 3 only has a zero weight, which counts for nothing
+    matrix = [
+        [1.0, 0.5, 0.0, 1.0],
+        [1.0, 0.0, 1.0, 0.5],
+        [0.0, 1.0, 1.0, 0.0],
+        [0.0, 0.0, 0.0, 0.0],
+    ]
+
+    def entries(self):
+        users, movies, weights = [], [], []
+        for user, row in enumerate(self.matrix):
+            for movie, weight in enumerate(row):
+                if weight or user == 3:
+                    users.append(user)
+                    movies.append(movie)
+                    weights.append(weight)
+        return users, movies, weights
+
+    def expected(self, k):
+        # Cosine of the matrix columns, damped by the number of common users
+        columns = list(zip(*self.matrix))
+        best = {}
+        for movie, column in enumerate(columns):
+            scores = []
+            for neighbour, other in enumerate(columns):
+                common = sum(1 for a, b in zip(column, other) if a and b)
+                if neighbour == movie or not common:
+                    continue
+                cosine = sum(a * b for a, b in zip(column, other)) / math.sqrt(
+                    sum(a * a for a in column) * sum(b * b for b in other)
+                )
+                scores.append((cosine * common / (common + SHRINKAGE), neighbour))
+            best[movie] = sorted(scores, reverse=True)[:k]
+        return best
+
+    def neighbours(self, k):
+        found = defaultdict(list)
+        for movie, neighbour, score in zip(*(array.tolist() for array in build_neighbours(*self.entries(), k=k))):
+            found[movie].append((score, neighbour))
+        return found
+
+    def assertNeighbours(self, k):
+        found, expected = self.neighbours(k), self.expected(k)
+        self.assertEqual(sorted(found), sorted(expected))
+        for movie, scores in expected.items():
+            self.assertEqual([neighbour for score, neighbour in found[movie]],
+                             [neighbour for score, neighbour in scores])
+            for (score, neighbour), (want, _) in zip(found[movie], scores):
+                self.assertAlmostEqual(score, want)
+
+    def test_matches_brute_force_cosine(self):
+        self.assertNeighbours(k=3)
+
+    def test_keeps_best_k(self):
+        self.assertNeighbours(k=1)
+
+    def test_chunks_add_up(self):
+        with patch('apps.movies.recommendations.CHUNK_PAIRS', 1):
+            self.assertNeighbours(k=3)
+
+
+class RecommendationTests(APITestCase):
+    def setUp(self):
+        action = Genre.objects.create(name='Action')
+        drama = Genre.objects.create(name='Drama')
+        self.liked = create_movie('Liked')
+        self.similar = create_movie('Similar', average_rating=2.0)
+        self.upcoming = create_movie('Upcoming', status='coming_soon')
+        self.drama = create_movie('Drama', average_rating=4.0)
+        self.action = create_movie('Action', average_rating=5.0)
+        self.drama.genres.set([drama])
+        self.action.genres.set([action])
+        MovieNeighbour.objects.bulk_create([
+            MovieNeighbour(movie=self.liked, neighbour=self.similar, score=0.5),
+            MovieNeighbour(movie=self.liked, neighbour=self.upcoming, score=0.9),
+        ])
+
+        self.user = get_user_model().objects.create_user('customer', 'customer@example.com', 'secret')
+        MovieWishlist.objects.create(user=self.user, movie=self.liked)
+
+    def recommend(self, preferred_genres):
+        # The project's user model carries the preferred genres
+        self.user.preferred_genres = preferred_genres
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('movie-recommendations'))
+        self.assertEqual(response.status_code, 200)
+        return [movie['title'] for movie in response.data]
+
+    def test_neighbours_first_then_preferred_genres(self):
+        self.assertEqual(self.recommend(['Drama']), ['Similar', 'Drama'])
+
+    def test_fills_from_best_rated_without_preferences(self):
+        self.assertEqual(self.recommend([]), ['Similar', 'Action', 'Drama'])
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_fails_deploy_check(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['movies.E001'])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                           'LOCATION': 'redis://127.0.0.1:6379/1'}})
+    def test_shared_cache_passes_deploy_check(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -11,6 +11,7 @@ urlpatterns = [
 
     # Search and recommendations
     path('search/', views.movie_search, name='movie-search'),
+    path('autocomplete/', views.movie_autocomplete, name='movie-autocomplete'),
     path('recommendations/', views.movie_recommendations, name='movie-recommendations'),
     path('sample/', views.sample_movies, name='sample-movies'),
 
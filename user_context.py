@@ -0,0 +1,56 @@
+from .models import MovieReview, MovieWishlist
+
+
+class UserMovieContext:
+    """
+    The requesting user's wishlist and reviews, read for many movies at once.
+
+    Movies are registered with ``add()`` as a page is serialized. The first
+    question about a wishlist or a review fetches that kind for every
+    registered movie with one query, so a page costs one query per kind
+    asked about, however many movies it shows.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.movie_ids = set()
+        self.wishlisted = set()
+        self.wishlist_loaded = set()
+        self.reviews = {}
+        self.reviews_loaded = set()
+
+    def add(self, movie_ids):
+        self.movie_ids.update(movie_ids)
+
+    def is_wishlisted(self, movie_id):
+        if movie_id not in self.wishlist_loaded:
+            self.movie_ids.add(movie_id)
+            missing = self.movie_ids - self.wishlist_loaded
+            self.wishlisted.update(MovieWishlist.objects.filter(
+                user=self.user,
+                movie_id__in=missing
+            ).values_list('movie_id', flat=True))
+            self.wishlist_loaded |= missing
+        return movie_id in self.wishlisted
+
+    def review(self, movie_id):
+        if movie_id not in self.reviews_loaded:
+            self.movie_ids.add(movie_id)
+            missing = self.movie_ids - self.reviews_loaded
+            for review in MovieReview.objects.filter(
+                user=self.user,
+                movie_id__in=missing
+            ).select_related('user'):
+                self.reviews[review.movie_id] = review
+            self.reviews_loaded |= missing
+        return self.reviews.get(movie_id)
+
+
+def user_movie_context(request):
+    """Return the ``UserMovieContext`` of ``request``, or None when anonymous."""
+    if request is None or not request.user.is_authenticated:
+        return None
+    context = getattr(request, '_user_movie_context', None)
+    if context is None:
+        context = request._user_movie_context = UserMovieContext(request.user)
+    return context
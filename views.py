@@ -1,7 +1,12 @@
+import hashlib
+import json
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Q, Avg
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
@@ -9,12 +14,35 @@ from .models import Movie, Genre, Language, MovieReview, MovieFormat, MovieWishl
 from .serializers import (
     MovieListSerializer, MovieDetailSerializer, GenreSerializer,
     LanguageSerializer, MovieReviewSerializer, MovieFormatSerializer,
-    MovieWishlistSerializer, MovieSearchSerializer
+    MovieWishlistSerializer, MovieSearchSerializer, movie_list_rows, serialize_movie_list
 )
+from .autocomplete import MAX_SUGGESTIONS, get_index as get_autocomplete_index
 from .filters import MovieFilter
+from .pagination import KeysetPagination, KeysetPaginationMixin
+from .ratings import record_ratings
+from .recommendations import CANDIDATES, RECOMMENDATIONS, rank_neighbours, user_interactions
+from .search import movie_index
 
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
 
-class MovieListView(generics.ListAPIView):
+
+class MovieRowsListMixin:
+    """
+    Lists movies from ``values()`` rows with ``serialize_movie_list``,
+    skipping model instances and per-field serializer work.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = movie_list_rows(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_movie_list(page, request))
+        return Response(serialize_movie_list(queryset, request))
+
+
+class MovieListView(KeysetPaginationMixin, MovieRowsListMixin, generics.ListAPIView):
     """List all movies with filtering and search"""
 
     queryset = Movie.objects.filter(is_active=True)
@@ -36,7 +64,7 @@ class MovieDetailView(generics.RetrieveAPIView):
     lookup_field = 'id'
 
 
-class NowShowingMoviesView(generics.ListAPIView):
+class NowShowingMoviesView(KeysetPaginationMixin, MovieRowsListMixin, generics.ListAPIView):
     """List movies currently showing"""
 
     serializer_class = MovieListSerializer
@@ -54,7 +82,7 @@ class NowShowingMoviesView(generics.ListAPIView):
         )
 
 
-class ComingSoonMoviesView(generics.ListAPIView):
+class ComingSoonMoviesView(KeysetPaginationMixin, MovieRowsListMixin, generics.ListAPIView):
     """List upcoming movies"""
 
     serializer_class = MovieListSerializer
@@ -72,7 +100,7 @@ class ComingSoonMoviesView(generics.ListAPIView):
         )
 
 
-class TopRatedMoviesView(generics.ListAPIView):
+class TopRatedMoviesView(KeysetPaginationMixin, MovieRowsListMixin, generics.ListAPIView):
     """List top rated movies"""
 
     serializer_class = MovieListSerializer
@@ -112,7 +140,7 @@ class MovieFormatListView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
 
 
-class MovieReviewListCreateView(generics.ListCreateAPIView):
+class MovieReviewListCreateView(KeysetPaginationMixin, generics.ListCreateAPIView):
     """List and create movie reviews"""
 
     serializer_class = MovieReviewSerializer
@@ -120,7 +148,7 @@ class MovieReviewListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         movie_id = self.kwargs['movie_id']
-        return MovieReview.objects.filter(movie_id=movie_id).order_by('-created_at')
+        return MovieReview.objects.filter(movie_id=movie_id).select_related('user').order_by('-created_at')
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -128,17 +156,9 @@ class MovieReviewListCreateView(generics.ListCreateAPIView):
         return context
 
     def perform_create(self, serializer):
-        movie = Movie.objects.get(id=self.kwargs['movie_id'])
-        review = serializer.save()
-
-        # Update movie average rating
-        avg_rating = MovieReview.objects.filter(movie=movie).aggregate(
-            avg_rating=Avg('rating')
-        )['avg_rating']
-
-        movie.average_rating = round(avg_rating, 1) if avg_rating else 0.0
-        movie.total_reviews = MovieReview.objects.filter(movie=movie).count()
-        movie.save()
+        with transaction.atomic():
+            review = serializer.save()
+            record_ratings(review.movie_id, added=[review.rating])
 
 
 class MovieReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -148,42 +168,39 @@ class MovieReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return MovieReview.objects.filter(user=self.request.user)
+        return MovieReview.objects.filter(user=self.request.user).select_related('user', 'movie')
 
     def perform_update(self, serializer):
-        review = serializer.save()
-
-        # Update movie average rating
-        movie = review.movie
-        avg_rating = MovieReview.objects.filter(movie=movie).aggregate(
-            avg_rating=Avg('rating')
-        )['avg_rating']
-
-        movie.average_rating = round(avg_rating, 1) if avg_rating else 0.0
-        movie.save()
+        with transaction.atomic():
+            # Lock the review so a concurrent edit cannot remove the same old rating twice
+            old_rating = MovieReview.objects.select_for_update().values_list(
+                'rating', flat=True
+            ).get(pk=serializer.instance.pk)
+            review = serializer.save()
+            if review.rating != old_rating:
+                record_ratings(review.movie_id, added=[review.rating], removed=[old_rating])
 
     def perform_destroy(self, instance):
-        movie = instance.movie
-        instance.delete()
+        with transaction.atomic():
+            rating = MovieReview.objects.select_for_update().filter(
+                pk=instance.pk
+            ).values_list('rating', flat=True).first()
+            # A review already deleted by a concurrent request no longer counts
+            if rating is not None:
+                instance.delete()
+                record_ratings(instance.movie_id, removed=[rating])
 
-        # Update movie average rating
-        avg_rating = MovieReview.objects.filter(movie=movie).aggregate(
-            avg_rating=Avg('rating')
-        )['avg_rating']
 
-        movie.average_rating = round(avg_rating, 1) if avg_rating else 0.0
-        movie.total_reviews = MovieReview.objects.filter(movie=movie).count()
-        movie.save()
-
-
-class MovieWishlistView(generics.ListCreateAPIView):
+class MovieWishlistView(KeysetPaginationMixin, generics.ListCreateAPIView):
     """List and add movies to wishlist"""
 
     serializer_class = MovieWishlistSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return MovieWishlist.objects.filter(user=self.request.user)
+        return MovieWishlist.objects.filter(
+            user=self.request.user
+        ).select_related('movie').prefetch_related('movie__genres', 'movie__languages')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -229,6 +246,29 @@ def toggle_wishlist(request, movie_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+def _search_count(queryset, filters):
+    """
+    Count the matches of a search, cached per normalized filter set.
+
+    Totals are shared for ``MOVIE_SEARCH_COUNT_TTL`` seconds, so paging
+    through the same search counts it once; they may lag behind new movies
+    by that long.
+    """
+    normalized = {
+        name: ' '.join(value.lower().split()) if isinstance(value, str) else value
+        for name, value in filters.items()
+        if name != 'sort_by' and value not in (None, '')
+    }
+    digest = hashlib.md5(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+    key = f'movie_search_count:{digest}'
+
+    count = cache.get(key)
+    if count is None:
+        count = queryset.order_by().count()
+        cache.set(key, count, getattr(settings, 'MOVIE_SEARCH_COUNT_TTL', 60))
+    return count
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def movie_search(request):
@@ -241,17 +281,21 @@ def movie_search(request):
 
         # Apply filters
         if data.get('query'):
-            queryset = queryset.filter(
-                Q(title__icontains=data['query']) |
-                Q(director__icontains=data['query']) |
-                Q(cast__icontains=data['query'])
-            )
+            queryset = movie_index.search(queryset, data['query'])
 
+        # Related-name filters as EXISTS subqueries match each movie once,
+        # so the results need no DISTINCT and counting them stays cheap
         if data.get('genre'):
-            queryset = queryset.filter(genres__name__icontains=data['genre'])
+            queryset = queryset.filter(Exists(Movie.genres.through.objects.filter(
+                movie=OuterRef('pk'),
+                genre__name__icontains=data['genre']
+            )))
 
         if data.get('language'):
-            queryset = queryset.filter(languages__name__icontains=data['language'])
+            queryset = queryset.filter(Exists(Movie.languages.through.objects.filter(
+                movie=OuterRef('pk'),
+                language__name__icontains=data['language']
+            )))
 
         if data.get('status'):
             queryset = queryset.filter(status=data['status'])
@@ -262,36 +306,50 @@ def movie_search(request):
         if data.get('min_rating'):
             queryset = queryset.filter(average_rating__gte=data['min_rating'])
 
-        # Apply sorting
-        sort_by = data.get('sort_by', '-release_date')
-        queryset = queryset.order_by(sort_by)
-
-        # Remove duplicates
-        queryset = queryset.distinct()
+        # Apply sorting; searches default to best matches first
+        sort_by = data.get('sort_by') or 'relevance'
+        if sort_by != 'relevance':
+            queryset = queryset.order_by(sort_by)
+        elif data.get('query'):
+            queryset = queryset.order_by('search_rank', '-release_date')
+        else:
+            queryset = queryset.order_by('-release_date')
+
+        # Cursor mode pages from the last row seen and never counts
+        if 'cursor' in request.query_params:
+            if sort_by == 'relevance' and data.get('query'):
+                return Response(
+                    {'sort_by': ['Cursor pagination needs a sort_by other than relevance.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            paginator = KeysetPagination()
+            movies = paginator.paginate_queryset(movie_list_rows(queryset), request)
+            return paginator.get_paginated_response(serialize_movie_list(movies, request))
 
         # Paginate results
-        page = request.query_params.get('page', 1)
-        page_size = request.query_params.get('page_size', 20)
-
         try:
-            page = int(page)
-            page_size = int(page_size)
+            page = max(int(request.query_params.get('page', 1)), 1)
         except ValueError:
             page = 1
-            page_size = 20
+
+        try:
+            page_size = int(request.query_params.get('page_size', SEARCH_PAGE_SIZE))
+        except ValueError:
+            page_size = SEARCH_PAGE_SIZE
+        page_size = min(max(page_size, 1), SEARCH_MAX_PAGE_SIZE)
 
         start = (page - 1) * page_size
         end = start + page_size
 
-        movies = queryset[start:end]
-        serializer = MovieListSerializer(movies, many=True, context={'request': request})
+        movies = movie_list_rows(queryset)[start:end]
+        count = _search_count(queryset, data)
 
         return Response({
-            'results': serializer.data,
-            'count': queryset.count(),
+            'results': serialize_movie_list(movies, request),
+            'count': count,
             'page': page,
             'page_size': page_size,
-            'total_pages': (queryset.count() + page_size - 1) // page_size
+            'total_pages': (count + page_size - 1) // page_size
         }, status=status.HTTP_200_OK)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -299,41 +357,63 @@ def movie_search(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
-def movie_recommendations(request):
-    """Get movie recommendations based on user preferences"""
+def movie_autocomplete(request):
+    """Type-ahead suggestions for titles, directors and cast"""
 
-    if request.user.is_authenticated:
-        # Get user's preferred genres
-        user_genres = request.user.preferred_genres
-
-        # Get user's wishlist and review history
-        wishlisted_movies = MovieWishlist.objects.filter(user=request.user).values_list('movie', flat=True)
-        reviewed_movies = MovieReview.objects.filter(user=request.user).values_list('movie', flat=True)
+    try:
+        limit = min(max(int(request.query_params.get('limit', MAX_SUGGESTIONS)), 1), MAX_SUGGESTIONS)
+    except ValueError:
+        limit = MAX_SUGGESTIONS
 
-        # Exclude already wishlisted and reviewed movies
-        excluded_movies = list(wishlisted_movies) + list(reviewed_movies)
+    suggestions = get_autocomplete_index().suggest(request.query_params.get('q', ''), limit)
+    return Response({'results': suggestions}, status=status.HTTP_200_OK)
 
-        queryset = Movie.objects.filter(
-            is_active=True,
-            status='now_showing'
-        ).exclude(id__in=excluded_movies)
 
-        # Filter by user's preferred genres if available
-        if user_genres:
-            queryset = queryset.filter(genres__name__in=user_genres)
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def movie_recommendations(request):
+    """Get movie recommendations based on user preferences"""
 
-        # Order by rating and popularity
-        queryset = queryset.order_by('-average_rating', '-total_reviews').distinct()[:10]
-    else:
+    if not request.user.is_authenticated:
         # For anonymous users, show top rated movies
         queryset = Movie.objects.filter(
             is_active=True,
             status='now_showing',
             average_rating__gte=4.0
-        ).order_by('-average_rating', '-total_reviews')[:10]
+        ).order_by('-average_rating', '-total_reviews')
+        return Response(serialize_movie_list(movie_list_rows(queryset)[:RECOMMENDATIONS], request), status=status.HTTP_200_OK)
+
+    # Movies liked by people who booked, wishlisted or rated the same ones
+    seen = user_interactions(request.user)
+    ranked = rank_neighbours(seen)[:CANDIDATES]
+    showing = {
+        row['id']: row for row in movie_list_rows(Movie.objects.filter(
+            id__in=ranked,
+            is_active=True,
+            status='now_showing'
+        ))
+    }
+    movies = [showing[movie_id] for movie_id in ranked if movie_id in showing][:RECOMMENDATIONS]
+
+    # Fill up from the user's preferred genres, which also covers
+    # users without history and catalogues without built neighbours
+    if len(movies) < RECOMMENDATIONS:
+        user_genres = request.user.preferred_genres
+        queryset = Movie.objects.filter(
+            is_active=True,
+            status='now_showing'
+        ).exclude(id__in=[*seen, *(movie['id'] for movie in movies)])
+
+        if user_genres:
+            queryset = queryset.filter(Exists(Movie.genres.through.objects.filter(
+                movie=OuterRef('pk'),
+                genre__name__in=user_genres
+            )))
+
+        queryset = queryset.order_by('-average_rating', '-total_reviews')
+        movies += movie_list_rows(queryset)[:RECOMMENDATIONS - len(movies)]
 
-    serializer = MovieListSerializer(queryset, many=True, context={'request': request})
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(serialize_movie_list(movies, request), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])